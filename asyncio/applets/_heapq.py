@@ -0,0 +1,49 @@
+"""Minimal heapq for boards built without the module."""
+
+
+def _sift_down(heap: list, start: int, pos: int) -> None:
+    item = heap[pos]
+    while pos > start:
+        parent = (pos - 1) >> 1
+        if item < heap[parent]:
+            heap[pos] = heap[parent]
+            pos = parent
+        else:
+            break
+    heap[pos] = item
+
+
+def _sift_up(heap: list, pos: int) -> None:
+    end = len(heap)
+    start = pos
+    item = heap[pos]
+    child = 2 * pos + 1
+    while child < end:
+        right = child + 1
+        if right < end and not heap[child] < heap[right]:
+            child = right
+        heap[pos] = heap[child]
+        pos = child
+        child = 2 * pos + 1
+    heap[pos] = item
+    _sift_down(heap, start, pos)
+
+
+def heappush(heap: list, item) -> None:
+    heap.append(item)
+    _sift_down(heap, 0, len(heap) - 1)
+
+
+def heappop(heap: list):
+    last = heap.pop()
+    if heap:
+        item = heap[0]
+        heap[0] = last
+        _sift_up(heap, 0)
+        return item
+    return last
+
+
+def heapify(heap: list) -> None:
+    for i in reversed(range(len(heap) // 2)):
+        _sift_up(heap, i)
@@ -1,6 +1,5 @@
 """Applet"""
 import asyncio
-import random
 from adafruit_ticks import *
 
 # Compatibility for running under CPython.
@@ -11,23 +10,165 @@ except (ImportError, NameError):
     from circuitpython_functools import partial
     from _types import GeneratorType
 
+try:
+    from heapq import heapify, heappop, heappush
+except ImportError:
+    from _heapq import heapify, heappop, heappush
+
 try:
     from circuitpython_typing import Union
 except (ImportError, NameError):
     pass
 
+# Hardware triggers are only available on CircuitPython.
+try:
+    import keypad
+except ImportError:
+    keypad = None
+
+# Blocking tasks run in threads where available, and inline otherwise.
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+try:
+    import logging
+except ImportError:
+    import adafruit_logging as logging
+
+try:
+    sleep_ms = asyncio.sleep_ms
+except AttributeError:
+    async def sleep_ms(ms: int) -> None:
+        """CPython's asyncio has no `sleep_ms`."""
+        await asyncio.sleep(ms / 1000)
+
+logger = logging.getLogger("applet")
+
+# Time source of the scheduler, see `set_clock`.
+_system_clock = ticks_ms
+
+
+def set_clock(clock=None) -> None:
+    """Replaces the scheduler's time source, e.g. with a simulated clock to run Applets in virtual time.
+
+    Tasks read the time when they are created, so Applets should be created after the clock is set.
+
+    :param clock: Object with a `ticks_ms` method. None restores the system clock.
+    """
+    global ticks_ms
+    ticks_ms = _system_clock if clock is None else clock.ticks_ms
+
 
-def gen_id(chars: int = 12) -> str:
-    """Generate a random ID of a specified length.
+def offload(func: callable, executor) -> callable:
+    """Wraps a blocking function in a coroutine function that runs it in one of the executor's threads, so it does
+    not freeze the event loop. Without an executor the function runs inline.
 
-    :param chars: Number of characters to use for the ID.
-    :return:
+    :param func: Synchronous function.
+    :param executor: `concurrent.futures` executor, or None.
+    """
+    if executor is None:
+        async def inline(*args, **kwargs):
+            return func(*args, **kwargs)
+        return inline
+
+    async def threaded(*args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+    return threaded
+
+
+class TaskStats:
+    """Profile of a task's runs, kept in a fixed set of counters so profiling never allocates per run. Times are in
+    milliseconds from `ticks_ms`, which stay small integers on CircuitPython where nanoseconds are long integers."""
+    __slots__ = ("runs", "total", "max", "late", "max_late", "missed", "timeouts")
+
+    def __init__(self):
+        self.runs = 0
+        # Runtime in milliseconds, measured from start to completion of each run including the time spent awaiting.
+        self.total = 0
+        self.max = 0
+        # Lateness in milliseconds, how long after its deadline each run started.
+        self.late = 0
+        self.max_late = 0
+        # Runs that would have been due while the task was late.
+        self.missed = 0
+        # Runs cancelled for exceeding the task's timeout.
+        self.timeouts = 0
+
+    def record(self, runtime: int, late: int = 0, interval: int = 0) -> None:
+        """Adds a run to the profile.
+
+        :param int runtime: Runtime in milliseconds.
+        :param int late: Milliseconds between the deadline and the start of the run.
+        :param int interval: Interval of the task, to count missed runs.
+        """
+        self.runs += 1
+        self.total += runtime
+        if runtime > self.max:
+            self.max = runtime
+        if late > 0:
+            self.late += late
+            if late > self.max_late:
+                self.max_late = late
+            if interval > 0:
+                self.missed += late // interval
+
+
+class TaskGroup(object):
+    """The asyncio tasks started on behalf of an Applet, so they can be cancelled and awaited together.
+
+    CircuitPython has no `asyncio.TaskGroup`. Unlike it, this group is not a context manager and a failing task does not
+    cancel the others: an Applet keeps one group for its whole life and empties it whenever it stops. Finished tasks
+    are dropped when the group grows, which keeps adding a task O(1) without a callback or wrapper per task.
     """
-    ascii_lowercase = 'abcdefghijklmnopqrstuvwxyz'
-    ascii_uppercase = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-    digits = '0123456789'
-    id_choice = ascii_lowercase + ascii_uppercase + digits
-    return ''.join(random.choice(id_choice) for _ in range(chars))
+
+    def __init__(self):
+        self._tasks = []
+        self._prune_at = 8
+
+    def __len__(self) -> int:
+        """Number of tasks that have not finished."""
+        return sum(1 for task in self._tasks if not task.done())
+
+    def add(self, task: asyncio.Task) -> asyncio.Task:
+        """Adds a task started elsewhere to the group."""
+        if len(self._tasks) >= self._prune_at:
+            self._tasks = [task for task in self._tasks if not task.done()]
+            self._prune_at = max(8, 2 * len(self._tasks))
+        self._tasks.append(task)
+        return task
+
+    def create_task(self, coro) -> asyncio.Task:
+        """Starts a coroutine as a task of the group."""
+        return self.add(asyncio.create_task(coro))
+
+    async def cancel(self, timeout: int = 1000) -> int:
+        """Cancels every task and waits for them to finish. The calling task is left alone.
+
+        :param int timeout: Longest to wait, in milliseconds.
+        :return: Number of tasks still running after the timeout.
+        :rtype: int
+        """
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+        start = ticks_ms()
+        delay = 0
+        while True:
+            self._tasks = [task for task in self._tasks if not task.done() and task is not current]
+            if not self._tasks or ticks_diff(ticks_ms(), start) >= timeout:
+                break
+            # Cancelled tasks normally finish on their next turn, only tasks ignoring the cancellation need polling.
+            await sleep_ms(delay)
+            delay = 1
+        self._prune_at = 8
+        return len(self._tasks)
+
+
+def _priority(task: 'Applet.AppTask') -> int:
+    return task.priority
 
 
 class Applet(object):
@@ -52,10 +193,55 @@ class Applet(object):
         supports both options.
     """
     __version__ = "0.0.0"
-    __tasks__ = dict()
-
-    def __init__(self, name: str):
+    # While set, `add_task` and the task decorators register nothing. Set while a precompiled schedule imports the
+    # Applet's module, see schedule.py.
+    frozen = False
+    # Priority classes. Due tasks are started in this order, so input handling runs before background work.
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+    def __init__(self, name: str, event_handler=None, budget: int = 10, workers: int = 2):
         self.__name__ = name
+        # Threads shared by the Applet's blocking tasks, created with the first one.
+        self.workers = workers
+        self._executor = None
+        # Longest a task should run between preemption points, in milliseconds.
+        self.budget = budget
+        self._slice = ticks_ms()
+        # Runs created but not yet started.
+        self._pending = 0
+        # First exception raised by a run, re-raised by the scheduler.
+        self._error = None
+        # EventHandler that `on_event` tasks are registered with.
+        self.event_handler = event_handler
+        # How often hardware event queues are checked, in milliseconds.
+        self.poll_interval = 10
+        # Every Applet has its own tasks, so several Applets can be loaded at once. Tasks are known by an integer
+        # handle, handed out in order and never reused. Names are optional and map to handles in a side table.
+        self.__tasks__ = dict()
+        self._names = {}
+        self._next_handle = 0
+        # Min-heap of tasks ordered by `next_run`, only populated while running.
+        self._queue = []
+        # Long-lived asyncio tasks by task handle, only populated while running persistently.
+        self._loops = {}
+        self._persistent = False
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._suspended = False
+        self._suspended_at = 0
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        # Tasks by hardware event source, and the asyncio task watching each source while running.
+        self._sources = {}
+        self._watchers = {}
+        self._pins = {}
+        # Runs that were not executed, and did not wake the scheduler, because their task or the Applet was suspended.
+        self.avoided_wakeups = 0
+        # Every asyncio task started for the Applet, including `run` itself, and what its tasks asked to be released.
+        self._group = TaskGroup()
+        self._resources = []
 
     def __repr__(self) -> str:
         return f"{self.__name__}(v{self.__version__})"
@@ -63,7 +249,9 @@ class Applet(object):
     def __str__(self) -> str:
         return self.__name__
 
-    def task(self, interval: int = 0, task_id: str = None, **func_args) -> callable:
+    def task(self, interval: int = 0, task_id: str = None, priority: int = NORMAL, blocking: bool = False,
+             timeout: int = 0, on_event=None, on_boot: bool = False, on_pin_change=None, on_keypad=None,
+             **func_args) -> callable:
         """Defines how tasks should be run by the Scheduler.
 
         Design Goals:
@@ -84,55 +272,275 @@ class Applet(object):
             executed, wasting both memory and compute cycles.
 
         :param int interval: How often the scheduler should run the task, in milliseconds.
-        :param str task_id: Identification string for the task. Must be unique or any new tasks
-        will be overwritten.
+        :param str task_id: Optional name for the task, unique within the Applet.
+        :param int priority: INTERACTIVE, NORMAL or BACKGROUND.
+        :param bool blocking: The function is synchronous and blocks, run it in a worker thread.
+        :param int timeout: Cancel runs taking longer than this many milliseconds.
+        :param on_event: Run the task whenever the Applet's EventHandler handles this Event or pattern.
+        :param bool on_boot: Also run a triggered task once when the Applet starts.
+        :param on_pin_change: Run the task whenever the level of this pin changes.
+        :param on_keypad: Run the task whenever this `keypad` scanner reports a key event.
         :param func_args: Dict of arguments to pass to the function.
         :return callable: The decorator object that registers the task.
         """
 
         def decorator(func: callable) -> callable:
-            """Registers the function as a task."""
-            args = func_args.pop("args", tuple())
-            kwargs = func_args.pop("kwargs", dict())
-            self.add_task(func, interval, task_id, *args, **kwargs)
-
-            def wrapper(*w_args, **w_kwargs) -> callable:
-                """Allows for multiple task decorators on a single function."""
-                return func(*w_args, **w_kwargs)
-
-            return wrapper
+            """Registers the function as a task. The function itself is returned, so decorators can be stacked and
+            the module attribute stays the function that was registered."""
+            self.add_task(func, interval, task_id, *func_args.get("args", ()), priority=priority, blocking=blocking,
+                          timeout=timeout, on_event=on_event, on_boot=on_boot, on_pin_change=on_pin_change,
+                          on_keypad=on_keypad, **func_args.get("kwargs", {}))
+            return func
         return decorator
 
-    def add_task(self, func: callable, interval: int = 0, task_id: str = None, *args, **kwargs) -> None:
+    def add_task(self, func: callable, interval: int = 0, task_id: str = None, *args, priority: int = NORMAL,
+                 blocking: bool = False, timeout: int = 0, on_event=None, on_boot: bool = False, on_pin_change=None,
+                 on_keypad=None, **kwargs) -> int:
         """Add a function with arguments as a task to be executed at a later time.
 
+        Tasks with a trigger do not run on an interval. They are never scheduled and only run when their trigger
+        fires, receiving the triggering event as their first argument (None for the run on boot).
+
         :param func: Function object to execute as a task.
         :type func: callable
         :param int interval: How often the scheduler should run the task, in milliseconds.
-        :param str task_id: Identification string for the task. Must be unique or any new tasks
-        with matching IDs will be overwritten.
+        :param str task_id: Optional name for the task, unique within the Applet.
         :param tuple args: List or Tuple of arguments to pass to the function.
+        :param int priority: INTERACTIVE, NORMAL or BACKGROUND. Due tasks start in order of priority.
+        :param bool blocking: `func` is a synchronous function that blocks, e.g. on file or I2C access. It runs in one
+        of `workers` threads under CPython, and inline on CircuitPython, which has no threads.
+        :param int timeout: Cancel runs taking longer than this many milliseconds, 0 for no limit. A timed out run is
+        counted in the task's stats and the task keeps its schedule. The thread of a blocking task can not be stopped.
+        :param on_event: Run the task whenever the Applet's EventHandler handles this Event or pattern.
+        :param bool on_boot: Also run a triggered task once when the Applet starts.
+        :param on_pin_change: Run the task whenever the level of this pin changes. Requires `keypad`.
+        :param on_keypad: Run the task whenever this `keypad` scanner reports a key event.
         :param dict kwargs: Dict of keyword arguments to pass to the function.
+        :return: Handle of the task, None while the Applet is `frozen`.
+        :rtype: int
         """
-        task_id = task_id or gen_id()
-        self.__tasks__.update({
-            task_id: self.AppTask(func, interval, task_id, *args, **kwargs)
-        })
-
-    def remove_task(self, task_id: str) -> None:
-        """Remove a task associated with the given ID.
-
-        :param str task_id: Identification string for the task.
+        if self.frozen:
+            return None
+        if task_id is not None and task_id in self._names:
+            raise ValueError(f"{self.__name__} already has a task named {task_id}")
+        if on_pin_change is not None:
+            on_keypad = self._pin_source(on_pin_change)
+        if (on_event is not None or on_keypad is not None) and interval:
+            raise ValueError("Triggered tasks do not run on an interval")
+        if on_event is not None and self.event_handler is None:
+            raise ValueError(f"{self.__name__} has no EventHandler for on_event tasks")
+        if priority not in (self.INTERACTIVE, self.NORMAL, self.BACKGROUND):
+            raise ValueError(f"Unknown priority: {priority}")
+        if blocking and self._executor is None and ThreadPoolExecutor is not None:
+            # Each task has at most one run in flight, so the executor's queue stays bounded by the number of tasks.
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.__name__)
+            self.add_resource(self._executor, self._shutdown)
+        handle = self._next_handle
+        self._next_handle += 1
+        task = self.AppTask(func, interval, task_id, *args, priority=priority, on_event=on_event, on_boot=on_boot,
+                            source=on_keypad, executor=self._executor if blocking else False, timeout=timeout,
+                            handle=handle, **kwargs)
+        self.__tasks__[handle] = task
+        if task_id is not None:
+            self._names[task_id] = handle
+        self._listen(task)
+        if self._running:
+            self._schedule(task)
+        return handle
+
+    def _handle(self, task) -> int:
+        """Handle of a task given by handle or by name."""
+        if isinstance(task, int):
+            return task
+        return self._names[task]
+
+    def _pop(self, task) -> 'AppTask':
+        """Forgets a task given by handle or by name."""
+        task = self.__tasks__.pop(self._handle(task))
+        if task.name is not None:
+            del self._names[task.name]
+        return task
+
+    def remove_task(self, task) -> None:
+        """Remove a task. Its name can be used again.
+
+        :param task: Handle or name of the task.
         """
-        del self.__tasks__[task_id]
+        task = self._pop(task)
+        self._unlisten(task)
+        if self._running:
+            self._unschedule(task)
 
-    def get_task(self, task_id: str) -> 'AppTask':
-        """Get all tasks associated with the Applet.
+    def suspend_task(self, task) -> None:
+        """Stop running a task until it is resumed. The task is removed from the scheduler entirely, so it causes no
+        wakeups while suspended. A run in progress is allowed to finish.
 
-        :return: Iterable of tasks executed by the Applet.
-        :rtype: GeneratorType
+        :param task: Handle or name of the task.
         """
-        return self.__tasks__[task_id]
+        task = self.get_task(task)
+        if task.suspended:
+            return
+        task.suspended = True
+        task.suspended_at = ticks_ms()
+        if self._running:
+            self._unschedule(task, cancel=False)
+
+    def resume_task(self, task) -> None:
+        """Resume a suspended task. If it became due while suspended it runs once right away.
+
+        :param task: Handle or name of the task.
+        """
+        task = self.get_task(task)
+        if not task.suspended:
+            return
+        task.suspended = False
+        avoided = task.missed(task.suspended_at)
+        task.avoided += avoided
+        self.avoided_wakeups += avoided
+        if self._running:
+            self._schedule(task)
+
+    async def cancel_task(self, task) -> None:
+        """Remove a task and cancel its run in progress, waiting for the cancellation to complete.
+
+        :param task: Handle or name of the task.
+        """
+        task = self._pop(task)
+        self._unlisten(task)
+        running = task.running
+        if self._running:
+            self._unschedule(task)
+        if running is not None:
+            running.cancel()
+            try:
+                await running
+            except asyncio.CancelledError:
+                pass
+
+    def _pin_source(self, pin) -> object:
+        """Returns the `keypad.Keys` scanning a single pin, shared by every task watching that pin."""
+        if keypad is None:
+            raise RuntimeError("on_pin_change requires the keypad module")
+        source = self._pins.get(pin)
+        if source is None:
+            # Keys reports both edges, so every change of level becomes an event.
+            source = self._pins[pin] = keypad.Keys((pin,), value_when_pressed=False, pull=True)
+            # Frees the pin when the Applet stops, so the next Applet can claim it.
+            self.add_resource(pin, self._release_pin)
+        return source
+
+    def _release_pin(self, pin) -> None:
+        self._pins.pop(pin).deinit()
+
+    def _shutdown(self, executor) -> None:
+        # Does not wait for threads still blocked in a task, they can not be interrupted.
+        executor.shutdown(wait=False)
+        if self._executor is executor:
+            self._executor = None
+
+    def _listen(self, task: 'AppTask') -> None:
+        """Connect a triggered task to its trigger."""
+        if task.on_event is not None:
+            task.handler = partial(self._trigger, task)
+            self.event_handler.add_handler(task.on_event, task.handler)
+        if task.source is not None:
+            tasks = self._sources.get(task.source)
+            if tasks is None:
+                tasks = self._sources[task.source] = []
+                if self._running:
+                    self._watchers[task.source] = self._group.create_task(self._watch(task.source))
+            tasks.append(task)
+
+    def _unlisten(self, task: 'AppTask') -> None:
+        """Disconnect a triggered task from its trigger."""
+        if task.handler is not None:
+            self.event_handler.remove_handler(task.on_event, task.handler)
+            task.handler = None
+        tasks = self._sources.get(task.source)
+        if tasks is not None:
+            tasks.remove(task)
+            if not tasks:
+                del self._sources[task.source]
+                watcher = self._watchers.pop(task.source, None)
+                if watcher is not None:
+                    watcher.cancel()
+
+    def _trigger(self, task: 'AppTask', event=None) -> None:
+        """Run a triggered task, unless it or the Applet is not running."""
+        if self._running and not self._suspended and not task.suspended:
+            self._group.add(task.fire(event))
+
+    async def _watch(self, source) -> None:
+        """Run the tasks triggered by a `keypad` scanner for each of its events.
+
+        The event queue is filled by the scanner in the background. Checking it is the only work done while nothing
+        happens, and none at all while the Applet is suspended. Events reported while suspended are discarded.
+        """
+        events = source.events
+        while True:
+            if self._suspended:
+                await self._resumed.wait()
+                events.clear()
+            event = events.get()
+            if event is None:
+                await sleep_ms(self.poll_interval)
+                continue
+            for task in self._sources.get(source, ()):
+                self._trigger(task, event)
+
+    def _start_triggers(self) -> None:
+        """Start watching the hardware event sources and run the tasks triggered on boot."""
+        for source in self._sources:
+            self._watchers[source] = self._group.create_task(self._watch(source))
+        for task in self.get_all_tasks():
+            if task.triggered and task.on_boot:
+                self._trigger(task)
+
+    def _stop_triggers(self) -> None:
+        """Stop watching the hardware event sources."""
+        for watcher in self._watchers.values():
+            watcher.cancel()
+        self._watchers = {}
+
+    def _schedule(self, task: 'AppTask') -> None:
+        """Add a task to the running scheduler."""
+        if task.suspended or task.done or task.triggered:
+            return
+        if self._persistent:
+            if self._suspended:
+                return
+            # A suspended loop may still be finishing its last run, it continues instead of starting another loop.
+            self._loops[task.handle] = task.running or self._group.create_task(self._loop(task))
+        elif not task.queued:
+            task.queued = True
+            heappush(self._queue, task)
+            # Wake the scheduler early if the new task is due before the current deadline.
+            if self._queue[0] is task:
+                self._wakeup.set()
+
+    def _unschedule(self, task: 'AppTask', cancel: bool = True) -> None:
+        """Remove a task from the running scheduler.
+
+        :param bool cancel: Cancel a run in progress. Otherwise it finishes and the task is not rescheduled.
+        """
+        if self._persistent:
+            loop = self._loops.pop(task.handle, None)
+            if loop is not None and (cancel or not task.executing):
+                task.cancel_loop(loop)
+        elif task.queued:
+            task.queued = False
+            self._queue.remove(task)
+            heapify(self._queue)
+        if cancel and not self._persistent and task.running is not None:
+            task.running.cancel()
+
+    def get_task(self, task) -> 'AppTask':
+        """Get a task by handle or by name.
+
+        :param task: Handle or name of the task.
+        :rtype: AppTask
+        """
+        return self.__tasks__[self._handle(task)]
 
     def get_all_tasks(self) -> GeneratorType:
         """Get all tasks associated with the Applet.
@@ -143,60 +551,404 @@ class Applet(object):
         yield from self.__tasks__.values()
 
     def get_scheduled_tasks(self) -> GeneratorType:
-        """Get a list of tasks scheduled to be executed
+        """Get the tasks that are due, removing them from the timing queue.
 
-        :param task:
-        :return:
+        :return: Iterable of due tasks, in order of their deadline.
+        :rtype: GeneratorType
         """
-        tasks = set()
         ticks = ticks_ms()
-        for t in self.get_all_tasks():
-            if ticks_less(t.next_run, ticks):
-                if t.interval > 0:
-                    # Generate a new coroutine object since they can only be used once.
-                    tasks.add(t())
-        yield from tasks
-
-    async def run(self) -> None:
-        """Executes the applet.
+        while self._queue and not ticks_less(ticks, self._queue[0].next_run):
+            task = heappop(self._queue)
+            task.queued = False
+            yield task
+
+    @property
+    def suspended(self) -> bool:
+        """Whether the Applet's tasks are suspended."""
+        return self._suspended
 
-        Coroutine objects can not be re-used once awaited.
-        New coroutine objects are created every loop.
+    def suspend(self) -> None:
+        """Stop executing the Applet's tasks until resumed, e.g. while another Applet is in the foreground.
+
+        A suspended Applet does not wake up for its deadlines. In persistent mode the tasks' loops are cancelled.
         """
-        print(f"Starting {self.__name__}")
-        while True:
-            await asyncio.gather(*self.get_scheduled_tasks())
+        if self._suspended:
+            return
+        self._suspended = True
+        self._suspended_at = ticks_ms()
+        self._resumed.clear()
+        # Skip the pending deadline, the scheduler goes straight to waiting for `resume`.
+        self._wakeup.set()
+        if self._persistent:
+            for handle, loop in self._loops.items():
+                self.__tasks__[handle].cancel_loop(loop)
+            self._loops = {}
+
+    def resume(self) -> None:
+        """Continue executing the Applet's tasks. Tasks that became due while suspended run once."""
+        if not self._suspended:
+            return
+        self._suspended = False
+        self._resumed.set()
+        for task in self.get_all_tasks():
+            if not task.suspended and not task.done:
+                self.avoided_wakeups += task.missed(self._suspended_at)
+        if self._running and self._persistent:
+            for task in self.get_all_tasks():
+                self._schedule(task)
+        self._wakeup.set()
+
+    async def checkpoint(self) -> None:
+        """Preemption point for long-running tasks.
+
+        Once the current task has run for longer than `budget` since the last checkpoint, tasks that became due are
+        started right here, without waiting for the scheduler to wake up, and run before the current task continues.
+        Other tasks reaching a checkpoint also wait for them to start. Background work should await this between
+        chunks.
+        """
+        now = ticks_ms()
+        if self._pending or ticks_diff(now, self._slice) >= self.budget:
+            if self._running and not self._persistent and not self._suspended:
+                self._start_due()
+            await asyncio.sleep(0)
+            # A run cancelled before it started never clears its count, so waiting is bounded by the budget.
+            while self._pending and ticks_diff(ticks_ms(), now) < self.budget:
+                await asyncio.sleep(0)
+            self._slice = ticks_ms()
+
+    def _start_due(self) -> bool:
+        """Start a run for every due task, in order of priority."""
+        due = sorted(self.get_scheduled_tasks(), key=_priority)
+        for task in due:
+            task.running = self._group.create_task(self._run(task))
+        self._pending += len(due)
+        return bool(due)
+
+    async def _run(self, task: 'AppTask') -> None:
+        """Executes one run of a task, rescheduling it once it completes."""
+        self._pending -= 1
+        self._slice = ticks_ms()
+        try:
+            await task()
+        except Exception as error:
+            if self._error is None:
+                self._error = error
+            self._wakeup.set()
+        finally:
+            task.running = None
+            if self._running and self.__tasks__.get(task.handle) is task:
+                self._schedule(task)
+
+    async def _loop(self, task: 'AppTask') -> None:
+        """Runs a task's persistent loop, handing an exception to `run` like `_run` does."""
+        try:
+            await task.loop()
+        except Exception as error:
+            if self._error is None:
+                self._error = error
+            self._wakeup.set()
+
+    async def _sleep(self) -> None:
+        """Sleep until the next deadline, or until a task is added."""
+        self._wakeup.clear()
+        if not self._queue:
+            await self._wakeup.wait()
+            return
+        delay = ticks_diff(self._queue[0].next_run, ticks_ms())
+        if delay > 0:
+            # Not `wait_for`, which loses a cancellation arriving together with the wakeup on some versions.
+            alarm = asyncio.create_task(self._alarm(delay))
+            try:
+                await self._wakeup.wait()
+            finally:
+                alarm.cancel()
+
+    async def _alarm(self, delay: int) -> None:
+        await sleep_ms(delay)
+        self._wakeup.set()
+
+    async def run(self, persistent: bool = False) -> None:
+        """Executes the applet.
+
+        Tasks are kept in a min-heap ordered by their next run. The scheduler sleeps until the earliest deadline
+        instead of polling. Tasks with an interval of 0 run once. Due tasks start in order of priority, each as its own
+        asyncio task, and are rescheduled when their run completes, so a slow task never holds up the others.
+        Coroutine objects can not be re-used once awaited, new coroutine objects are created for every run.
+        Triggered tasks are not scheduled at all, each trigger starts its run as a separate asyncio task.
 
-    async def stop(self) -> None:
-        """ Stop the applet """
-        pass
+        In persistent mode every task instead becomes one long-lived asyncio task running its own interval loop, so
+        steady-state scheduling allocates nothing.
+
+        :param bool persistent: Run each task as a long-lived asyncio task.
+        """
+        logger.info("Starting %s", self.__name__)
+        self._group.add(asyncio.current_task())
+        self._running = True
+        self._persistent = persistent
+        if persistent:
+            try:
+                for task in sorted(self.get_all_tasks(), key=_priority):
+                    self._schedule(task)
+                self._start_triggers()
+                while True:
+                    if self._error is not None:
+                        error, self._error = self._error, None
+                        raise error
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+            finally:
+                self._running = False
+                self._stop_triggers()
+                for loop in self._loops.values():
+                    loop.cancel()
+                self._loops = {}
+            return
+        self._queue = []
+        for task in self.get_all_tasks():
+            self._schedule(task)
+        self._start_triggers()
+        try:
+            while True:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+                if self._suspended:
+                    await self._resumed.wait()
+                    continue
+                if not self._start_due():
+                    await self._sleep()
+                    continue
+                # Let the runs start, and other Applets take a turn, before the next batch.
+                await asyncio.sleep(0)
+        finally:
+            self._running = False
+            self._pending = 0
+            self._stop_triggers()
+            for task in self.get_all_tasks():
+                if task.running is not None:
+                    task.running.cancel()
+            for task in self._queue:
+                task.queued = False
+            self._queue = []
+
+    def stats(self) -> list:
+        """Profile of every task, slowest first.
+
+        :return: Tuples of task ID, runs, total and max runtime in milliseconds, mean and max lateness in
+            milliseconds, missed runs and timed out runs.
+        :rtype: list[tuple]
+        """
+        rows = []
+        for task in self.get_all_tasks():
+            stats = task.stats
+            rows.append((
+                task.task_id, stats.runs, stats.total, stats.max,
+                stats.late / stats.runs if stats.runs else 0.0, stats.max_late, stats.missed, stats.timeouts,
+            ))
+        rows.sort(key=lambda row: -row[3])
+        return rows
+
+    def dump_stats(self, stream=None) -> None:
+        """Writes the profile of every task as one compact line per task, slowest first.
+
+        :param stream: Object with a `write` method, e.g. `usb_cdc.data`. Printed to the console by default.
+        """
+        for row in self.stats():
+            line = "%s %d %d %d %.1f %d %d %d" % row
+            if stream is None:
+                print(line)
+            else:
+                stream.write(line + "\n")
+
+    def add_resource(self, resource, release: callable = None):
+        """Register something a task acquired, e.g. a display group, a pin or a file, to be released when the Applet
+        stops. Resources are released in reverse order of registration, after every task has finished.
+
+        :param resource: The resource.
+        :param release: Called with the resource to release it. Defaults to its `deinit` or `close` method.
+        :return: The resource.
+        """
+        if release is None:
+            release = getattr(resource, "deinit", None) or getattr(resource, "close", None)
+            if release is None:
+                raise ValueError(f"{resource!r} has no deinit or close method, pass a release function")
+        else:
+            release = partial(release, resource)
+        self._resources.append(release)
+        return resource
+
+    async def stop(self, timeout: int = 1000) -> int:
+        """Stop the Applet. Cancels `run` and every task it started, waits for them to finish, and then releases the
+        registered resources in reverse order. Triggered tasks are disconnected from their Events first. The Applet's own resources, the `keypad` scanners of `on_pin_change`
+        tasks and the threads of blocking tasks, were registered first and are released last. Tasks using them can
+        not run again, re-create the Applet instead, as the Registry does.
+
+        :param int timeout: Longest to wait for the tasks, in milliseconds.
+        :return: Number of tasks still running after the timeout. Their resources are released regardless.
+        :rtype: int
+        """
+        # A shared EventHandler would otherwise keep the triggered tasks, and with them the Applet, alive.
+        for task in self.__tasks__.values():
+            self._unlisten(task)
+        left = await self._group.cancel(timeout)
+        if left:
+            logger.warning("%s: %d tasks did not stop within %d ms", self.__name__, left, timeout)
+        while self._resources:
+            release = self._resources.pop()
+            try:
+                release()
+            except Exception as error:
+                logger.error("%s: releasing a resource failed: %s", self.__name__, error)
+        return left
 
     class AppTask(object):
         """ Abstraction of a task that get executed by the scheduler. Contains extra attributes that otherwise wouldn't
         be set on function or coroutine objects. Both are immutable and do not contain the `__dict__` attribute."""
-        def __init__(self, func: callable, interval: int = 0, task_id: str = None, *args, **kwargs) -> None:
+        def __init__(self, func: callable, interval: int = 0, task_id: str = None, *args, priority: int = 1,
+                     on_event=None, on_boot: bool = False, source=None, executor=False, timeout: int = 0,
+                     handle: int = 0, **kwargs) -> None:
             """Add a function with arguments as a task to be executed at a later time.
 
             :param func: Function object to execute as a task.
             :type func: callable
             :param int interval: How often the scheduler should run the task, in milliseconds.
-            :param str task_id: Identification string for the task. Must be unique or any new tasks
-            with matching IDs will be overwritten.
+            :param str task_id: Optional name for the task.
             :param tuple args: List or Tuple of arguments to pass to the function.
+            :param int priority: Priority class of the task.
+            :param on_event: Event or pattern triggering the task.
+            :param bool on_boot: Also run a triggered task once when the Applet starts.
+            :param source: `keypad` scanner whose events trigger the task.
+            :param executor: Executor running the blocking function, None to run it inline. False if the function is a
+            coroutine function.
+            :param int timeout: Maximum runtime of a run in milliseconds, 0 for no limit.
+            :param int handle: Handle of the task within its Applet.
             :param dict kwargs: Dict of keyword arguments to pass to the function.
             """
-            # Generate task IDs if not provided
-            self.task_id = task_id or gen_id()
+            self.handle = handle
+            self.name = task_id
+            # Name of the task, or its handle for unnamed tasks. Used in logs and stats, so it is built once here.
+            self.task_id = task_id if task_id is not None else f"#{handle}"
             self.func = func
+            # Awaited for every run.
+            self.call = func if executor is False else offload(func, executor)
             self.args = args
             self.kwargs = kwargs
             self.interval = interval
-            self.next_run = 0
+            self.priority = priority
+            self.timeout = timeout
+            self.next_run = ticks_ms()
+            # Ticks at the start of the last run, see StallDetector.suspects.
+            self.started = self.next_run
+            # Triggers
+            self.on_event = on_event
+            self.on_boot = on_boot
+            self.source = source
+            self.handler = None
+            # Scheduler state
+            self.queued = False
+            self.executing = False
+            self.done = False
+            self.suspended = False
+            self.suspended_at = 0
+            self.avoided = 0
+            # The asyncio task of the run in progress, or of the loop in persistent mode.
+            self.running = None
+            self.stats = TaskStats()
 
         async def __call__(self, *args, **kwargs) -> None:
-            print(f"Executing: {self.task_id}")
-            self.next_run = ticks_add(ticks_ms(), self.interval)
-            await self.func(*self.args, **self.kwargs)
+            logger.debug("Executing: %s", self.task_id)
+            now = self.started = ticks_ms()
+            late = ticks_diff(now, self.next_run)
+            self.next_run = ticks_add(now, self.interval)
+            self.executing = True
+            try:
+                await self.invoke()
+            finally:
+                self.stats.record(ticks_diff(ticks_ms(), now), late, self.interval)
+                self.executing = False
+                if self.interval <= 0:
+                    self.done = True
+
+        def invoke(self, *args):
+            """Calls the function, returning the awaitable of one run. Runs are limited to `timeout` if set."""
+            run = self.call(*(args + self.args), **self.kwargs)
+            return self._limit(run) if self.timeout else run
+
+        async def _limit(self, run) -> None:
+            try:
+                await asyncio.wait_for(run, self.timeout / 1000)
+            except asyncio.TimeoutError:
+                self.stats.timeouts += 1
+                logger.warning("Timed out: %s after %d ms", self.task_id, self.timeout)
+
+        @property
+        def triggered(self) -> bool:
+            """Whether the task runs on a trigger instead of an interval."""
+            return self.on_event is not None or self.source is not None
+
+        async def run_triggered(self, event) -> None:
+            logger.debug("Triggered: %s", self.task_id)
+            self.started = ticks_ms()
+            self.executing = True
+            try:
+                await self.invoke(event)
+            finally:
+                self.stats.record(ticks_diff(ticks_ms(), self.started))
+                self.executing = False
+
+        def fire(self, event=None) -> asyncio.Task:
+            """Starts a run for a trigger, passing it the triggering event."""
+            self.running = asyncio.create_task(self.run_triggered(event))
+            return self.running
+
+        def missed(self, since: int) -> int:
+            """Number of runs that would have been due since the given ticks."""
+            if self.interval <= 0:
+                return 0
+            return max(0, ticks_diff(ticks_ms(), since)) // self.interval
+
+        async def loop(self) -> None:
+            """Runs the task on its interval until cancelled or suspended.
+
+            Deadlines advance by exactly one interval from the previous deadline, so execution time does not
+            accumulate as drift. Runs missed during an overrun are skipped rather than executed back to back.
+            """
+            current = self.running = asyncio.current_task()
+            try:
+                while not self.suspended:
+                    delay = ticks_diff(self.next_run, ticks_ms())
+                    if delay > 0:
+                        await sleep_ms(delay)
+                    logger.debug("Executing: %s", self.task_id)
+                    self.started = ticks_ms()
+                    late = ticks_diff(self.started, self.next_run)
+                    self.executing = True
+                    try:
+                        await self.invoke()
+                    finally:
+                        self.stats.record(ticks_diff(ticks_ms(), self.started), late, self.interval)
+                        self.executing = False
+                    if self.interval <= 0:
+                        self.done = True
+                        return
+                    self.next_run = ticks_add(self.next_run, self.interval)
+                    now = ticks_ms()
+                    if ticks_less(self.next_run, now):
+                        self.stats.missed += ticks_diff(now, self.next_run) // self.interval + 1
+                        self.next_run = ticks_add(now, self.interval)
+            finally:
+                if self.running is current:
+                    self.running = None
+
+        def cancel_loop(self, loop: asyncio.Task) -> None:
+            """Cancels the loop, forgetting it right away so a new loop can start before it has finished."""
+            loop.cancel()
+            if self.running is loop:
+                self.running = None
+
+        def __lt__(self, other: 'AppTask') -> bool:
+            """Orders tasks by deadline for the scheduler's heap, safe across ticks wraparound."""
+            return ticks_less(self.next_run, other.next_run)
 
         def __repr__(self) -> str:
             return f"{self.__class__.__name__}{self.__dict__}"
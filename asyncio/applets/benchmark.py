@@ -0,0 +1,331 @@
+""" Benchmarks for applet.py, run under CPython """
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from adafruit_ticks import ticks_diff, ticks_ms
+import virtual
+from applet import Applet
+from registry import Registry
+from schedule import precompile
+from scheduler import Scheduler
+
+# Applet module with about 40 KiB of data, standing in for fonts and bitmaps.
+APPLET_MODULE = """
+from applet import Applet
+
+app = Applet("{name}")
+TABLE = [i * i for i in range(1000)]
+frames = []
+
+
+@app.task(interval=20)
+async def frame():
+    frames.append(sum(TABLE[:10]))
+"""
+
+
+def make_applet(name: str, tasks: int, last_runs: dict, jitter: list) -> Applet:
+    """Applet with tasks on intervals between 50 and 500 ms recording the deviation from their interval."""
+    app = Applet(name)
+    for i in range(tasks):
+        interval = 50 + (i * 37) % 451
+
+        async def task(task_id=i, interval=interval):
+            now = ticks_ms()
+            if task_id in last_runs:
+                jitter.append(abs(ticks_diff(now, last_runs[task_id]) - interval))
+            last_runs[task_id] = now
+
+        app.add_task(task, interval, f"task{i}")
+    return app
+
+
+async def run_for(app: Applet, seconds: float, persistent: bool = False) -> None:
+    runner = asyncio.create_task(app.run(persistent))
+    await asyncio.sleep(seconds)
+    runner.cancel()
+    try:
+        await runner
+    except asyncio.CancelledError:
+        pass
+
+
+def bench_scheduler(seconds: float = 2.0) -> None:
+    """CPU idle percentage and scheduling jitter for 10, 100 and 1000 tasks."""
+    for tasks in (10, 100, 1000):
+        jitter = []
+        app = make_applet("Bench", tasks, {}, jitter)
+        wall = time.monotonic()
+        cpu = time.process_time()
+        asyncio.run(run_for(app, seconds))
+        cpu = time.process_time() - cpu
+        wall = time.monotonic() - wall
+        jitter.sort()
+        mean = sum(jitter) / len(jitter) if jitter else 0
+        p99 = jitter[len(jitter) * 99 // 100] if jitter else 0
+        print(
+            f"scheduler: {tasks:>4} tasks, {100 * (1 - cpu / wall):5.1f}% idle, "
+            f"{len(jitter)} runs, jitter mean {mean:.2f} ms, p99 {p99} ms"
+        )
+
+
+def bench_latency(seconds: float = 2.0, workers: int = 4) -> None:
+    """Input-to-handler latency while background tasks burn CPU in 50 ms chunks, with and without checkpoints."""
+    for checkpoints in (False, True):
+        latency = []
+        pressed = []
+        app = Applet("Bench")
+
+        async def busy():
+            end = ticks_ms() + 50
+            while ticks_diff(end, ticks_ms()) > 0:
+                if checkpoints:
+                    await app.checkpoint()
+
+        async def press():
+            pressed.append(ticks_ms())
+
+        async def poll():
+            while pressed:
+                latency.append(ticks_diff(ticks_ms(), pressed.pop()))
+
+        for i in range(workers):
+            app.add_task(busy, 20, f"busy{i}", priority=Applet.BACKGROUND)
+        app.add_task(press, 37, "press")
+        app.add_task(poll, 5, "poll", priority=Applet.INTERACTIVE)
+        asyncio.run(run_for(app, seconds))
+        latency.sort()
+        mean = sum(latency) / len(latency) if latency else 0
+        p99 = latency[len(latency) * 99 // 100] if latency else 0
+        mode = "checkpoints" if checkpoints else "no checkpoints"
+        print(f"latency: {mode:>14}, {len(latency)} inputs, mean {mean:.1f} ms, p99 {p99} ms")
+
+
+def bench_blocking(seconds: float = 2.0) -> None:
+    """Lateness of a 10 ms task while another task blocks for 50 ms every 100 ms, inline and offloaded to a thread."""
+    for blocking in (False, True):
+        app = Applet("Bench")
+
+        async def tick():
+            pass
+
+        def write_file():
+            time.sleep(0.05)
+
+        async def write_file_inline():
+            write_file()
+
+        app.add_task(tick, 10, "tick")
+        if blocking:
+            app.add_task(write_file, 100, "write", blocking=True)
+        else:
+            app.add_task(write_file_inline, 100, "write")
+        asyncio.run(run_for(app, seconds))
+        for task_id, runs, total, maximum, late, max_late, missed, timeouts in app.stats():
+            if task_id == "tick":
+                mode = "offloaded" if blocking else "inline"
+                print(f"blocking: {mode:>9}, {runs} ticks, lateness mean {late:.1f} ms, max {max_late} ms, "
+                      f"{missed} missed")
+
+
+async def first_frame(module: str) -> None:
+    while module not in sys.modules or not sys.modules[module].frames:
+        await asyncio.sleep(0)
+
+
+async def boot(names: list, lazy: bool, samples: list) -> float:
+    """Starts the first Applet, importing the others eagerly or lazily, and switches through all of them."""
+    start = time.monotonic()
+    scheduler = Scheduler()
+    runner = asyncio.create_task(scheduler.run())
+    registry = Registry(scheduler)
+    for name in names:
+        registry.register(name)
+        if not lazy:
+            __import__(name)
+            scheduler.load(sys.modules[name].app)
+    if lazy:
+        await registry.activate(names[0])
+    else:
+        scheduler.focus(names[0])
+    await first_frame(names[0])
+    elapsed = time.monotonic() - start
+    for name in names:
+        if lazy:
+            await registry.activate(name)
+        else:
+            scheduler.focus(name)
+        await first_frame(name)
+        gc.collect()
+        samples.append(tracemalloc.get_traced_memory()[0])
+    scheduler.stop()
+    await runner
+    return elapsed
+
+
+def bench_registry(applets: int = 5) -> None:
+    """Boot time to the first frame, and heap in use after switching to each of five Applets, eager vs lazy."""
+    with tempfile.TemporaryDirectory() as path:
+        names = [f"bench_app{i}" for i in range(applets)]
+        for name in names:
+            with open(os.path.join(path, f"{name}.py"), "w") as module:
+                module.write(APPLET_MODULE.format(name=name))
+        sys.path.insert(0, path)
+        # Both runs compile the modules from source.
+        sys.dont_write_bytecode = True
+        try:
+            for lazy in (False, True):
+                samples = []
+                gc.collect()
+                tracemalloc.start()
+                elapsed = asyncio.run(boot(names, lazy, samples))
+                tracemalloc.stop()
+                for name in names:
+                    sys.modules.pop(name, None)
+                mode = "lazy" if lazy else "eager"
+                print(f"registry: {mode:>5}, first frame {elapsed * 1000:.1f} ms, "
+                      f"heap after each switch {[size // 1024 for size in samples]} KiB")
+        finally:
+            sys.dont_write_bytecode = False
+            sys.path.remove(path)
+
+
+def bench_schedule(tasks: int = 100) -> None:
+    """Import time and heap of an Applet with 100 interval tasks, registered vs loaded as a precompiled schedule."""
+    source = 'from applet import Applet\n\napp = Applet("Frozen")\n'
+    for i in range(tasks):
+        source += f"\n\n@app.task(interval={50 + (i * 37) % 451}, args=({i},))\nasync def task{i}(index):\n    pass\n"
+    with tempfile.TemporaryDirectory() as path:
+        with open(os.path.join(path, "bench_frozen.py"), "w") as module:
+            module.write(source)
+        sys.path.insert(0, path)
+        import bench_frozen
+        with open(os.path.join(path, "bench_frozen_schedule.py"), "w") as module:
+            precompile(bench_frozen.app, "bench_frozen", module)
+        del bench_frozen
+        sys.dont_write_bytecode = True
+        try:
+            for module in ("bench_frozen", "bench_frozen_schedule"):
+                sys.modules.pop("bench_frozen", None)
+                gc.collect()
+                tracemalloc.start()
+                start = time.monotonic()
+                __import__(module)
+                elapsed = time.monotonic() - start
+                gc.collect()
+                size = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                sys.modules.pop(module, None)
+                mode = "precompiled" if module.endswith("schedule") else "registered"
+                print(f"schedule: {mode:>11}, {tasks} tasks, import {elapsed * 1000:.1f} ms, heap {size // 1024} KiB")
+        finally:
+            sys.dont_write_bytecode = False
+            sys.path.remove(path)
+
+
+async def simulate(tasks: int, seconds: float, samples: list) -> Applet:
+    app = Applet("Bench")
+    for i in range(tasks):
+        async def task():
+            pass
+        app.add_task(task, 50 + (i * 37) % 451, f"task{i}")
+    runner = asyncio.create_task(app.run())
+    await asyncio.sleep(seconds / 2)
+    # Only trace the second half, tracemalloc slows the scheduler down several times.
+    gc.collect()
+    tracemalloc.start()
+    await asyncio.sleep(seconds / 2)
+    gc.collect()
+    samples.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+    runner.cancel()
+    return app
+
+
+def bench_virtual() -> None:
+    """Scheduler throughput, lateness and heap growth over the second half, simulated in virtual time across the
+    ticks wraparound. Lateness only depends on the scheduler, so results are repeatable on any machine."""
+    for tasks, seconds in ((10, 600), (100, 120), (1000, 20)):
+        samples = []
+        wall = time.monotonic()
+        app = virtual.run(simulate(tasks, seconds, samples), (1 << 29) - seconds * 500)
+        wall = time.monotonic() - wall
+        rows = app.stats()
+        runs = sum(row[1] for row in rows)
+        late = sum(row[4] * row[1] for row in rows) / runs
+        print(
+            f"virtual: {tasks:>4} tasks, {seconds:>4} s simulated in {wall:.1f} s, {runs / wall:.0f} runs/s, "
+            f"lateness mean {late:.2f} ms, max {max(row[5] for row in rows)} ms, "
+            f"heap growth {samples[0]} B"
+        )
+
+
+async def sample_memory(app: Applet, seconds: float, persistent: bool, samples: list) -> None:
+    runner = asyncio.create_task(app.run(persistent))
+    for _ in range(int(seconds * 2)):
+        await asyncio.sleep(0.5)
+        samples.append(tracemalloc.get_traced_memory()[0])
+    runner.cancel()
+    try:
+        await runner
+    except asyncio.CancelledError:
+        pass
+
+
+def bench_registration(tasks: int = 1000) -> None:
+    """Time and heap to register 1000 tasks, with and without names, and to look each of them up."""
+    async def task():
+        pass
+
+    for named in (False, True):
+        app = Applet("Bench")
+        names = [f"task{i}" for i in range(tasks)] if named else [None] * tasks
+        gc.collect()
+        tracemalloc.start()
+        start = time.monotonic_ns()
+        for name in names:
+            app.add_task(task, 100, name)
+        elapsed = time.monotonic_ns() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.monotonic_ns()
+        for registered in list(app.get_all_tasks()):
+            app.get_task(registered.task_id if named else registered.handle)
+        lookup = time.monotonic_ns() - start
+        mode = "named" if named else "unnamed"
+        print(f"registration: {mode:>7}, {tasks} tasks, {elapsed / tasks / 1000:.1f} us and {size // tasks} B per task, "
+              f"lookup {lookup / tasks / 1000:.2f} us")
+
+
+def bench_memory(seconds: float = 3.0, tasks: int = 10) -> None:
+    """Heap in use while tasks run every 5 ms, sampled every 0.5 s. Steady state should stay flat."""
+    for persistent in (False, True):
+        samples = []
+        app = Applet("Bench")
+        for i in range(tasks):
+            async def task():
+                pass
+            app.add_task(task, 5, f"task{i}")
+        gc.collect()
+        tracemalloc.start()
+        asyncio.run(sample_memory(app, seconds, persistent, samples))
+        tracemalloc.stop()
+        mode = "persistent" if persistent else "heap"
+        growth = samples[-1] - samples[1]
+        print(f"memory: {mode:>10}, samples {[size // 1024 for size in samples]} KiB, growth {growth} B")
+
+
+if __name__ == "__main__":
+    bench_scheduler()
+    bench_latency()
+    bench_blocking()
+    bench_registry()
+    bench_schedule()
+    bench_virtual()
+    bench_registration()
+    bench_memory()
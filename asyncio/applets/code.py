@@ -1,17 +1,20 @@
 """ Async Scheduler """
 import asyncio
 
+from registry import Registry
+from scheduler import Scheduler
 
-async def scheduler():
-    """ Loads and executes the applet. """
-    import myapp
-    app = myapp.app
 
-    try:
-        await app.run()
-    finally:
-        await app.stop()
+async def scheduler(*names: str):
+    """ Registers the applets and executes the first one. The others are only imported once activated. """
+    applets = Scheduler()
+    registry = Registry(applets)
+    for name in names:
+        registry.register(name)
+    if names:
+        await registry.activate(names[0])
+    await applets.run()
 
 
 if __name__ == "__main__":
-    asyncio.run(scheduler(), debug=True)
+    asyncio.run(scheduler("myapp"), debug=True)
@@ -0,0 +1,99 @@
+"""Registry"""
+import asyncio
+import gc
+import os
+import sys
+
+from applet import Applet
+from scheduler import Scheduler
+
+
+class Registry(object):
+    """Knows every Applet by the name of its module, without importing it.
+
+    Only the active Applet is resident. Activating an Applet imports its module and loads its `app` into the
+    Scheduler; switching away unloads it and removes the module from `sys.modules`, so its code and data can be
+    collected before the next Applet is imported.
+
+    :param Scheduler scheduler: Scheduler running the active Applet.
+    """
+
+    def __init__(self, scheduler: Scheduler):
+        self.scheduler = scheduler
+        self._modules = []
+        self._active = None
+        self._applet = None
+
+    def __contains__(self, module: str) -> bool:
+        return module in self._modules
+
+    @property
+    def modules(self) -> list:
+        """Names of the registered modules."""
+        return list(self._modules)
+
+    @property
+    def active(self) -> str:
+        """Module name of the active Applet, if any."""
+        return self._active
+
+    def register(self, module: str) -> None:
+        """Make an Applet available for activation. The module is not imported.
+
+        :param str module: Name of the module defining the Applet as `app`.
+        """
+        if module not in self._modules:
+            self._modules.append(module)
+
+    def discover(self, path: str = "/apps", prefix: str = "") -> list:
+        """Register every module in a directory by listing the files, without importing them.
+
+        :param str path: Directory containing the Applet modules. It is added to `sys.path`.
+        :param str prefix: Only register modules whose names start with this prefix.
+        :return: Names of the modules found.
+        :rtype: list
+        """
+        found = []
+        for filename in sorted(os.listdir(path)):
+            module, _, extension = filename.rpartition(".")
+            if extension in ("py", "mpy") and module.startswith(prefix) and not module.startswith("_"):
+                self.register(module)
+                found.append(module)
+        if found and path not in sys.path:
+            sys.path.append(path)
+        return found
+
+    async def activate(self, module: str) -> Applet:
+        """Import an Applet and bring it to the foreground, unloading the active Applet first.
+
+        :param str module: Name of a registered module.
+        :return: The activated Applet.
+        :rtype: Applet
+        """
+        if module not in self._modules:
+            raise KeyError(f"Applet module {module} is not registered")
+        if module == self._active:
+            return self._applet
+        await self.deactivate()
+        __import__(module)
+        applet = sys.modules[module].app
+        self.scheduler.load(applet)
+        self.scheduler.focus(str(applet))
+        self._active = module
+        self._applet = applet
+        return applet
+
+    async def deactivate(self) -> None:
+        """Unload the active Applet and release its module."""
+        if self._active is None:
+            return
+        applet, self._applet = self._applet, None
+        module, self._active = self._active, None
+        # The Scheduler unloads every Applet when it stops.
+        if str(applet) in self.scheduler.applets:
+            await self.scheduler.unload(str(applet))
+        del applet
+        sys.modules.pop(module, None)
+        # Let the event loop drop its last references to the stopped tasks before collecting.
+        await asyncio.sleep(0)
+        gc.collect()
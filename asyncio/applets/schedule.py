@@ -0,0 +1,133 @@
+"""Frozen schedules"""
+from array import array
+
+from adafruit_ticks import ticks_add, ticks_diff
+
+import applet
+from applet import Applet, sleep_ms
+
+_EMPTY = {}
+
+
+class Schedule(object):
+    """Static schedule of interval tasks, kept in parallel arrays indexed by task.
+
+    A frozen schedule has no per-task objects and nothing to register at boot. Due tasks run one at a time in the
+    order they were registered, like a superloop, so they should await rather than block. Tasks with an interval of 0
+    run once.
+
+    :param tuple task_ids: Identification string of every task.
+    :param tuple funcs: Coroutine function of every task.
+    :param intervals: Interval of every task, in milliseconds.
+    :param tuple args: Arguments of every task.
+    :param tuple kwargs: Keyword arguments of every task, None for none.
+    """
+
+    def __init__(self, task_ids: tuple, funcs: tuple, intervals, args: tuple = None, kwargs: tuple = None):
+        count = len(funcs)
+        self.task_ids = tuple(task_ids)
+        self.funcs = tuple(funcs)
+        self.intervals = array("L", intervals)
+        self.args = tuple(args) if args is not None else ((),) * count
+        self.kwargs = tuple(kwargs) if kwargs is not None else (None,) * count
+        self.next_run = array("L", self.intervals)
+        # 1 once a task without interval has run.
+        self.done = bytearray(count)
+        if not count == len(self.task_ids) == len(self.intervals) == len(self.args) == len(self.kwargs):
+            raise ValueError("Every task needs an ID, function, interval, arguments and keyword arguments")
+
+    def __len__(self) -> int:
+        return len(self.funcs)
+
+    async def run(self) -> None:
+        """Executes the schedule until every task without interval has run and no task has an interval."""
+        now = applet.ticks_ms()
+        for index in range(len(self.funcs)):
+            self.next_run[index] = now
+            self.done[index] = 0
+        while True:
+            soonest = None
+            for index in range(len(self.funcs)):
+                if self.done[index]:
+                    continue
+                now = applet.ticks_ms()
+                delay = ticks_diff(self.next_run[index], now)
+                if delay > 0:
+                    if soonest is None or delay < soonest:
+                        soonest = delay
+                    continue
+                interval = self.intervals[index]
+                self.next_run[index] = ticks_add(now, interval)
+                await self.funcs[index](*self.args[index], **(self.kwargs[index] or _EMPTY))
+                if interval:
+                    soonest = 0
+                else:
+                    self.done[index] = 1
+            if soonest is None:
+                return
+            await sleep_ms(soonest)
+
+
+def _frozen_tasks(app: Applet) -> list:
+    tasks = list(app.get_all_tasks())
+    for task in tasks:
+        if task.triggered or task.timeout:
+            raise ValueError(f"Task {task.task_id} uses a trigger or timeout, which a frozen schedule can not run")
+    return tasks
+
+
+def freeze(app: Applet) -> Schedule:
+    """Turns the tasks registered with an Applet into a Schedule.
+
+    :param Applet app: Applet with interval tasks only.
+    :rtype: Schedule
+    """
+    tasks = _frozen_tasks(app)
+    return Schedule(
+        [task.task_id for task in tasks],
+        [task.call for task in tasks],
+        [task.interval for task in tasks],
+        [task.args for task in tasks],
+        [task.kwargs or None for task in tasks],
+    )
+
+
+def precompile(app: Applet, module: str, stream) -> None:
+    """Writes a module that builds the Applet's Schedule when imported, without registering any task. Compile it
+    with `mpy-cross` so the device boots straight into the schedule.
+
+    The task functions must be module-level functions of the Applet's module, and their arguments literals.
+
+    :param Applet app: Applet with interval tasks only.
+    :param str module: Name of the module defining the Applet.
+    :param stream: Writable text stream for the generated source.
+    """
+    # Only runs on the host, boards have no `ast`.
+    from ast import literal_eval
+
+    tasks = _frozen_tasks(app)
+    names = []
+    for task in tasks:
+        if task.call is not task.func or getattr(task.func, "__module__", module) != module or \
+                "<" in task.func.__qualname__:
+            raise ValueError(f"Task {task.task_id} is not a module-level coroutine function of {module}")
+        for value in (task.args, task.kwargs):
+            try:
+                literal = literal_eval(repr(value)) == value
+            except (ValueError, SyntaxError):
+                literal = False
+            if not literal:
+                raise ValueError(f"Arguments of task {task.task_id} are not literals")
+        if task.func.__name__ not in names:
+            names.append(task.func.__name__)
+    stream.write(f'"""Schedule of {app}, generated by schedule.py. Do not edit."""\n')
+    stream.write("from applet import Applet\nfrom schedule import Schedule\n\n")
+    stream.write("# Import the functions without registering their tasks.\nApplet.frozen = True\ntry:\n")
+    stream.write(f"    from {module} import {', '.join(sorted(names))}\nfinally:\n    Applet.frozen = False\n\n")
+    stream.write("schedule = Schedule(\n")
+    stream.write(f"    {tuple(task.task_id for task in tasks)!r},\n")
+    stream.write(f"    ({''.join(task.func.__name__ + ', ' for task in tasks)}),\n")
+    stream.write(f"    {tuple(task.interval for task in tasks)!r},\n")
+    stream.write(f"    {tuple(task.args for task in tasks)!r},\n")
+    stream.write(f"    {tuple(task.kwargs or None for task in tasks)!r},\n")
+    stream.write(")\n")
@@ -0,0 +1,111 @@
+"""Scheduler"""
+import asyncio
+
+from applet import Applet
+from stall import StallDetector
+
+
+class Scheduler(object):
+    """Runs several Applets concurrently.
+
+    Every Applet runs its own scheduling loop as an asyncio task and yields between batches of tasks, so Applets get
+    fair turns on the event loop. Applets in the background can be suspended so their tasks stop consuming CPU while
+    the foreground Applet runs.
+
+    :param int stall_threshold: Report a stall when the event loop does not turn for this many milliseconds. Not
+    monitored if None.
+    :param float watchdog_timeout: Seconds without a turn of the event loop before the hardware watchdog resets the
+    board. Requires `stall_threshold`.
+    """
+
+    def __init__(self, stall_threshold: int = None, watchdog_timeout: float = None):
+        self._applets = {}
+        self.detector = None
+        if stall_threshold is not None:
+            self.detector = StallDetector(self, stall_threshold, watchdog_timeout)
+        self._persistent = {}
+        self._runners = {}
+        self._foreground = None
+        self._running = False
+        self._stopped = asyncio.Event()
+
+    def __getitem__(self, name: str) -> Applet:
+        return self._applets[name]
+
+    @property
+    def applets(self) -> list:
+        """Names of the loaded Applets."""
+        return list(self._applets)
+
+    @property
+    def foreground(self) -> Applet:
+        """The Applet in the foreground, if any."""
+        return self._foreground
+
+    def load(self, applet: Applet, persistent: bool = False) -> None:
+        """Load an Applet. It starts running right away if the Scheduler is running.
+
+        :param Applet applet: The Applet to load.
+        :param bool persistent: Run the Applet's tasks as long-lived asyncio tasks.
+        """
+        if str(applet) in self._applets:
+            raise ValueError(f"Applet {applet} is already loaded")
+        self._applets[str(applet)] = applet
+        self._persistent[str(applet)] = persistent
+        if self._running:
+            self._start(applet)
+
+    def _start(self, applet: Applet) -> None:
+        name = str(applet)
+        self._runners[name] = asyncio.create_task(applet.run(self._persistent[name]))
+
+    async def unload(self, name: str) -> None:
+        """Stop and unload an Applet.
+
+        :param str name: Name of the Applet.
+        """
+        applet = self._applets.pop(name)
+        del self._persistent[name]
+        runner = self._runners.pop(name, None)
+        if runner is not None:
+            runner.cancel()
+            try:
+                await runner
+            except asyncio.CancelledError:
+                pass
+        await applet.stop()
+        if self._foreground is applet:
+            self._foreground = None
+
+    def focus(self, name: str, suspend_others: bool = True) -> None:
+        """Bring an Applet to the foreground, resuming it.
+
+        :param str name: Name of the Applet.
+        :param bool suspend_others: Suspend every other Applet.
+        """
+        self._foreground = self._applets[name]
+        self._foreground.resume()
+        if suspend_others:
+            for applet in self._applets.values():
+                if applet is not self._foreground:
+                    applet.suspend()
+
+    async def run(self) -> None:
+        """Run every loaded Applet until stopped or cancelled, then unload them."""
+        self._running = True
+        self._stopped.clear()
+        for name in self._applets:
+            self._start(self._applets[name])
+        detector = asyncio.create_task(self.detector.run()) if self.detector is not None else None
+        try:
+            await self._stopped.wait()
+        finally:
+            self._running = False
+            if detector is not None:
+                detector.cancel()
+            for name in list(self._applets):
+                await self.unload(name)
+
+    def stop(self) -> None:
+        """Stop running and unload every Applet."""
+        self._stopped.set()
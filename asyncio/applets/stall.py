@@ -0,0 +1,128 @@
+"""Stall detection"""
+import asyncio
+
+from adafruit_ticks import ticks_diff
+
+import applet
+from applet import logger, sleep_ms
+
+# Under CPython a thread watches the heartbeat, so a stall is reported while it happens and the offending task is
+# known exactly. CircuitPython has no threads and reports stalls once the event loop turns again.
+try:
+    import threading
+except ImportError:
+    threading = None
+
+
+class StallDetector(object):
+    """Notices when the event loop has not turned for longer than `threshold`, i.e. a task runs without awaiting.
+
+    A heartbeat task wakes every half `threshold`, which is the only cost while nothing stalls. On hardware the
+    heartbeat can also feed `microcontroller.watchdog`, so a stall that never ends resets the board.
+
+    :param scheduler: Scheduler whose Applets' tasks are reported as the cause of a stall.
+    :param int threshold: Longest the event loop may go without turning, in milliseconds.
+    :param float hardware_timeout: Seconds without a heartbeat before the watchdog resets the board. Not used if
+    None or if the board has no watchdog.
+    """
+
+    def __init__(self, scheduler, threshold: int = 100, hardware_timeout: float = None):
+        self.scheduler = scheduler
+        self.threshold = threshold
+        self.hardware_timeout = hardware_timeout
+        self.stalls = 0
+        self.longest = 0
+        # Duration in milliseconds and suspected task IDs of the last stall.
+        self.last = None
+        self._beat = applet.ticks_ms()
+        self._reported = False
+        self._loop = None
+        self._halt = None
+
+    def suspects(self, current=None, since: int = None) -> list:
+        """IDs of the tasks that may have caused a stall.
+
+        Without threads a stall is only noticed once it has ended, when the task that blocked is usually no longer
+        running. Nothing else starts while the event loop is blocked, so the blocking task is the one followed by the
+        longest gap before the next task started, unless it blocked after resuming from an await.
+
+        :param current: The asyncio task that was running during the stall, if known.
+        :param int since: Ticks of the last heartbeat before the stall, if the stall has ended.
+        :return: The task running `current`, or every task with a run in progress, or the task that blocked.
+        :rtype: list
+        """
+        suspects = []
+        started = []
+        for name in self.scheduler.applets:
+            for task in self.scheduler[name].get_all_tasks():
+                if current is not None:
+                    if task.running is current:
+                        return [task.task_id]
+                elif task.executing:
+                    suspects.append(task.task_id)
+                elif since is not None and ticks_diff(task.started, since) >= 0:
+                    started.append((ticks_diff(task.started, since), task.task_id))
+        if not suspects and started:
+            started.sort()
+            started.append((ticks_diff(applet.ticks_ms(), since), None))
+            suspects.append(max((started[i + 1][0] - started[i][0], started[i][1]) for i in range(len(started) - 1))[1])
+        return suspects
+
+    def report(self, duration: int, suspects: list) -> None:
+        """Records a stall and logs it as a warning."""
+        self.stalls += 1
+        self.last = (duration, suspects)
+        logger.warning("Event loop stalled for %d ms in %s", duration, ", ".join(suspects) or "unknown")
+
+    def _monitor(self, period: int) -> None:
+        """Thread reporting a stall while the event loop is blocked."""
+        while not self._halt.wait(period / 1000):
+            stalled = ticks_diff(applet.ticks_ms(), self._beat) - period
+            if stalled > self.threshold and not self._reported:
+                self._reported = True
+                self.report(stalled, self.suspects(asyncio.current_task(self._loop)))
+
+    async def run(self) -> None:
+        """Beats until cancelled."""
+        period = max(1, self.threshold // 2)
+        watchdog = None
+        if self.hardware_timeout is not None:
+            # Only imported when used, Blinka provides `microcontroller` without a watchdog.
+            try:
+                from microcontroller import watchdog
+                from watchdog import WatchDogMode
+            except ImportError:
+                pass
+        hardware = watchdog is not None
+        if hardware:
+            watchdog.timeout = self.hardware_timeout
+            watchdog.mode = WatchDogMode.RESET
+        monitor = None
+        if threading is not None:
+            self._loop = asyncio.get_running_loop()
+            self._halt = threading.Event()
+            monitor = threading.Thread(target=self._monitor, args=(period,), daemon=True)
+            monitor.start()
+        self._beat = applet.ticks_ms()
+        try:
+            while True:
+                if hardware:
+                    watchdog.feed()
+                await sleep_ms(period)
+                now = applet.ticks_ms()
+                stalled = ticks_diff(now, self._beat) - period
+                since, self._beat = self._beat, now
+                if stalled > self.threshold:
+                    self.longest = max(self.longest, stalled)
+                    if not self._reported:
+                        self.report(stalled, self.suspects(since=since))
+                self._reported = False
+        finally:
+            if monitor is not None:
+                self._halt.set()
+            if hardware:
+                try:
+                    watchdog.deinit()
+                except RuntimeError:
+                    # Some ports can not stop the watchdog once started, a reset ends the program instead.
+                    pass
@@ -0,0 +1,508 @@
+""" Tests applet.py """
+import asyncio
+import gc
+import threading
+import time
+import tracemalloc
+import unittest
+import weakref
+import applet
+from adafruit_ticks import ticks_diff, ticks_ms
+from applet import Applet
+from scheduler import Scheduler
+
+
+class Events:
+    """Stands in for events/event.py's EventHandler, which lives outside this directory."""
+    def __init__(self):
+        self.handlers = {}
+
+    def add_handler(self, event, func):
+        self.handlers.setdefault(event, []).append(func)
+
+    def remove_handler(self, event, func):
+        self.handlers[event].remove(func)
+
+    def handle_event(self, event):
+        for func in self.handlers.get(event, ()):
+            func(event)
+
+
+class TestApplet(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.app = Applet("Test")
+        self.runs = []
+
+    async def record(self, name):
+        self.runs.append((name, ticks_ms()))
+
+    async def run_for(self, seconds, persistent=False):
+        runner = asyncio.create_task(self.app.run(persistent))
+        await asyncio.sleep(seconds)
+        runner.cancel()
+        try:
+            await runner
+        except asyncio.CancelledError:
+            pass
+
+    def count(self, name):
+        return len([run for run in self.runs if run[0] == name])
+
+    async def test_interval(self):
+        self.app.add_task(self.record, 100, "fast", "fast")
+        self.app.add_task(self.record, 0, "once", "once")
+        await self.run_for(0.25)
+        self.assertEqual(self.count("fast"), 3, "Task not executed on its interval.")
+        self.assertEqual(self.count("once"), 1, "Task without interval not executed once.")
+
+    async def test_wakeup(self):
+        self.app.add_task(self.record, 10000, "slow", "slow")
+        runner = asyncio.create_task(self.app.run())
+        await asyncio.sleep(0.05)
+        start = ticks_ms()
+        self.app.add_task(self.record, 10000, "added", "added")
+        await asyncio.sleep(0.02)
+        runner.cancel()
+        self.assertEqual(self.count("added"), 1, "Scheduler not woken up by a new task.")
+        self.assertLess(ticks_diff(self.runs[-1][1], start), 20)
+
+    async def test_remove(self):
+        self.app.add_task(self.record, 50, "removed", "removed")
+        runner = asyncio.create_task(self.app.run())
+        await asyncio.sleep(0.01)
+        self.app.remove_task("removed")
+        await asyncio.sleep(0.1)
+        runner.cancel()
+        self.assertEqual(self.count("removed"), 1, "Removed task still executed.")
+
+    async def test_persistent(self):
+        self.app.add_task(self.record, 100, "fast", "fast")
+        self.app.add_task(self.record, 0, "once", "once")
+        await self.run_for(0.25, persistent=True)
+        self.assertEqual(self.count("fast"), 3, "Persistent task not executed on its interval.")
+        self.assertEqual(self.count("once"), 1, "Persistent task without interval not executed once.")
+        self.assertEqual(self.app._loops, {}, "Persistent tasks not cancelled.")
+
+    async def test_persistent_drift(self):
+        async def slow():
+            self.runs.append(("slow", ticks_ms()))
+            await asyncio.sleep(0.02)
+
+        self.app.add_task(slow, 50, "slow")
+        await self.run_for(0.25, persistent=True)
+        start = self.runs[0][1]
+        offsets = [ticks_diff(run[1], start) for run in self.runs]
+        # Without drift compensation the fifth run would start after 4 * 70 ms.
+        self.assertGreaterEqual(len(offsets), 5)
+        self.assertLess(offsets[4], 240, "Execution time accumulated as drift.")
+
+    async def test_persistent_add_remove(self):
+        runner = asyncio.create_task(self.app.run(persistent=True))
+        await asyncio.sleep(0)
+        self.app.add_task(self.record, 50, "added", "added")
+        await asyncio.sleep(0.01)
+        self.app.remove_task("added")
+        await asyncio.sleep(0.1)
+        runner.cancel()
+        self.assertEqual(self.count("added"), 1, "Removed persistent task still executed.")
+
+    async def test_isolated_tasks(self):
+        other = Applet("Other")
+        other.add_task(self.record, 0, "other", "other")
+        self.assertEqual([t.task_id for t in self.app.get_all_tasks()], [], "Applets share their tasks.")
+
+    def test_handles(self):
+        first = self.app.add_task(self.record, 10, None, "first")
+        named = self.app.add_task(self.record, 10, "named", "named")
+        self.assertEqual((first, named), (0, 1), "Handles not handed out in order.")
+        self.assertIs(self.app.get_task("named"), self.app.get_task(named))
+        self.assertEqual(self.app.get_task(first).task_id, "#0")
+        with self.assertRaises(ValueError):
+            self.app.add_task(self.record, 10, "named", "duplicate")
+        self.app.remove_task("named")
+        self.assertEqual(self.app.add_task(self.record, 10, "named", "named"), 2, "Handle reused.")
+        with self.assertRaises(KeyError):
+            self.app.get_task(named)
+
+    async def test_suspend(self):
+        self.app.add_task(self.record, 50, "fast", "fast")
+        runner = asyncio.create_task(self.app.run())
+        await asyncio.sleep(0.01)
+        self.app.suspend()
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.count("fast"), 1, "Suspended applet still executed tasks.")
+        self.app.resume()
+        await asyncio.sleep(0.01)
+        runner.cancel()
+        self.assertEqual(self.count("fast"), 2, "Resumed applet did not run its due task.")
+
+    async def check_suspend_task(self, persistent):
+        self.app.add_task(self.record, 40, "fast", "fast")
+        runner = asyncio.create_task(self.app.run(persistent))
+        await asyncio.sleep(0.01)
+        self.app.suspend_task("fast")
+        self.assertNotIn(self.app.get_task("fast"), self.app._queue, "Suspended task still scheduled.")
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.count("fast"), 1, "Suspended task still executed.")
+        self.app.resume_task("fast")
+        await asyncio.sleep(0.01)
+        runner.cancel()
+        self.assertEqual(self.count("fast"), 2, "Resumed task not executed.")
+        self.assertGreaterEqual(self.app.avoided_wakeups, 4, "Avoided wakeups not counted.")
+        self.assertEqual(self.app.get_task("fast").avoided, self.app.avoided_wakeups)
+
+    async def test_suspend_task(self):
+        await self.check_suspend_task(False)
+
+    async def test_suspend_task_persistent(self):
+        await self.check_suspend_task(True)
+
+    async def check_cancel_task(self, persistent):
+        cancelled = []
+
+        async def hang():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        self.app.add_task(hang, 100, "hang")
+        self.app.add_task(self.record, 20, "fast", "fast")
+        runner = asyncio.create_task(self.app.run(persistent))
+        await asyncio.sleep(0.01)
+        await self.app.cancel_task("hang")
+        self.assertEqual(cancelled, [True], "Run in progress not cancelled.")
+        await asyncio.sleep(0.05)
+        runner.cancel()
+        self.assertNotIn("hang", [t.task_id for t in self.app.get_all_tasks()])
+        self.assertGreater(self.count("fast"), 1, "Other tasks blocked by the cancelled task.")
+
+    async def test_cancel_task(self):
+        await self.check_cancel_task(False)
+
+    async def test_cancel_task_persistent(self):
+        await self.check_cancel_task(True)
+
+    async def test_on_event(self):
+        self.app.event_handler = Events()
+        self.app.add_task(self.record, on_event="enter", task_id="enter")
+        self.app.add_task(self.record, on_event="esc", on_boot=True, task_id="esc")
+        self.app.event_handler.handle_event("enter")
+        runner = asyncio.create_task(self.app.run())
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.runs, [(None, self.runs[0][1])], "Triggered task not run once on boot.")
+        self.app.event_handler.handle_event("enter")
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.runs[-1][0], "enter", "Task not run with its triggering event.")
+        self.app.remove_task("enter")
+        self.app.event_handler.handle_event("enter")
+        await asyncio.sleep(0.01)
+        runner.cancel()
+        self.assertEqual(len(self.runs), 2, "Event before start or after removal triggered a task.")
+        self.assertEqual(self.app._queue, [], "Triggered task scheduled on an interval.")
+
+    async def test_on_keypad(self):
+        class Queue(list):
+            def get(self):
+                return self.pop(0) if self else None
+
+        class Keys:
+            events = Queue()
+
+        keys = Keys()
+        self.app.add_task(self.record, on_keypad=keys, task_id="keys")
+        runner = asyncio.create_task(self.app.run())
+        await asyncio.sleep(0.01)
+        keys.events.append("pressed")
+        await asyncio.sleep(0.03)
+        self.app.suspend()
+        keys.events.append("suspended")
+        await asyncio.sleep(0.03)
+        self.app.resume()
+        await asyncio.sleep(0.03)
+        runner.cancel()
+        self.assertEqual([run[0] for run in self.runs], ["pressed"], "Keypad events not delivered to the task.")
+
+    def test_on_event_without_handler(self):
+        with self.assertRaises(ValueError):
+            self.app.add_task(self.record, on_event="enter")
+
+    async def test_priority(self):
+        self.app.add_task(self.record, 0, "background", "background", priority=Applet.BACKGROUND)
+        self.app.add_task(self.record, 0, "normal", "normal")
+        self.app.add_task(self.record, 0, "interactive", "interactive", priority=Applet.INTERACTIVE)
+        await self.run_for(0.01)
+        self.assertEqual([run[0] for run in self.runs], ["interactive", "normal", "background"])
+        with self.assertRaises(ValueError):
+            self.app.add_task(self.record, priority=3)
+
+    async def test_preemption(self):
+        async def busy():
+            end = ticks_ms() + 200
+            while ticks_diff(end, ticks_ms()) > 0:
+                await self.app.checkpoint()
+
+        self.app.budget = 5
+        self.app.add_task(busy, 0, "busy", priority=Applet.BACKGROUND)
+        self.app.add_task(self.record, 10, "input", "input", priority=Applet.INTERACTIVE)
+        await self.run_for(0.2)
+        # About 20 runs when preempted, a single one if the busy task held the loop.
+        self.assertGreater(self.count("input"), 5, "Background task not preempted at its checkpoints.")
+
+    async def test_error(self):
+        async def fail():
+            raise RuntimeError("failed")
+
+        self.app.add_task(fail, 0, "fail")
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(self.app.run(), 1)
+
+    async def test_error_persistent(self):
+        async def fail():
+            raise RuntimeError("failed")
+
+        self.app.add_task(fail, 20, "fail")
+        with self.assertRaises(RuntimeError):
+            await asyncio.wait_for(self.app.run(persistent=True), 1)
+        self.assertEqual(self.app._loops, {}, "Failed loop not cleaned up.")
+
+    async def test_stats(self):
+        async def slow():
+            await asyncio.sleep(0.05)
+
+        self.app.add_task(slow, 20, "slow")
+        self.app.add_task(self.record, 10, "fast", "fast")
+        await self.run_for(0.12)
+        rows = self.app.stats()
+        self.assertEqual([row[0] for row in rows], ["slow", "fast"], "Tasks not sorted slowest first.")
+        task_id, runs, total, maximum, late, max_late, missed, timeouts = rows[0]
+        self.assertEqual(runs, 3)
+        self.assertGreaterEqual(maximum, 50)
+        self.assertGreaterEqual(max_late, 30)
+        self.assertEqual(rows[1][1], self.count("fast"))
+        self.assertGreater(missed, 0, "Runs missed while overrunning the interval not counted.")
+        lines = []
+
+        class Stream:
+            def write(self, line):
+                lines.append(line)
+
+        self.app.dump_stats(Stream())
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("slow 3 "))
+
+    async def test_blocking(self):
+        threads = []
+
+        def read_sensor(value):
+            time.sleep(0.05)
+            threads.append((value, threading.current_thread()))
+
+        self.app.add_task(read_sensor, 0, "sensor", 42, blocking=True)
+        self.app.add_task(self.record, 10, "fast", "fast")
+        await self.run_for(0.08)
+        self.assertEqual(len(threads), 1)
+        self.assertEqual(threads[0][0], 42, "Arguments not passed to the blocking function.")
+        self.assertIsNot(threads[0][1], threading.main_thread(), "Blocking function ran on the event loop.")
+        self.assertGreater(self.count("fast"), 4, "Event loop frozen by the blocking function.")
+
+    async def test_timeout(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        self.app.add_task(hang, 50, "hang", timeout=20)
+        self.app.add_task(self.record, 10, "fast", "fast")
+        await self.run_for(0.15)
+        stats = self.app.get_task("hang").stats
+        # Runs start every 50 ms and time out 20 ms later, allow for a loaded event loop.
+        self.assertGreaterEqual(stats.timeouts, 2, "Hung run not cancelled after its timeout.")
+        self.assertLessEqual(stats.timeouts, 3)
+        self.assertGreater(self.count("fast"), 5)
+
+    async def check_stop(self, persistent):
+        released = []
+
+        class Resource:
+            def __init__(self, name):
+                self.name = name
+
+            def deinit(self):
+                released.append(self.name)
+
+        async def acquire():
+            self.app.add_resource(Resource("pin"))
+            self.app.add_resource(Resource("display"))
+            self.app.add_resource("file", released.append)
+            await asyncio.sleep(10)
+
+        self.app.add_task(acquire, 100, "acquire")
+        self.app.add_task(self.record, 10, "fast", "fast")
+        asyncio.create_task(self.app.run(persistent))
+        await asyncio.sleep(0.05)
+        self.assertEqual(await self.app.stop(), 0, "Tasks not stopped.")
+        self.assertEqual(len(self.app._group), 0, "Tasks left running.")
+        self.assertEqual(released, ["file", "display", "pin"], "Resources not released in reverse order.")
+        count = self.count("fast")
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.count("fast"), count, "Stopped applet still executed tasks.")
+
+    async def test_stop(self):
+        await self.check_stop(False)
+
+    async def test_stop_persistent(self):
+        await self.check_stop(True)
+
+    async def test_stop_timeout(self):
+        async def stubborn():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                await asyncio.sleep(0.2)
+
+        self.app.add_task(stubborn, 0, "stubborn")
+        asyncio.create_task(self.app.run())
+        await asyncio.sleep(0.01)
+        self.assertEqual(await self.app.stop(50), 1, "Task ignoring its cancellation not reported.")
+
+    async def test_stop_releases_own(self):
+        deinit = []
+
+        class Queue(list):
+            def get(self):
+                return None
+
+        class Keys:
+            def __init__(self, pins, **kwargs):
+                self.pins = pins
+                self.events = Queue()
+
+            def deinit(self):
+                deinit.append(self.pins)
+
+        keypad, applet.keypad = applet.keypad, type("keypad", (), {"Keys": Keys})
+        try:
+            self.app.add_task(self.record, on_pin_change="GP15", task_id="button")
+        finally:
+            applet.keypad = keypad
+        self.app.add_task(time.sleep, 0, "sleep", 0, blocking=True)
+        executor = self.app._executor
+        asyncio.create_task(self.app.run())
+        await asyncio.sleep(0.01)
+        await self.app.stop()
+        self.assertEqual(deinit, [("GP15",)], "Pin not released.")
+        self.assertTrue(executor._shutdown, "Threads not shut down.")
+        self.assertIsNone(self.app._executor)
+
+    def test_resource_without_release(self):
+        with self.assertRaises(ValueError):
+            self.app.add_resource(object())
+
+
+class TestScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_applets(self):
+        runs = []
+
+        def make(name, persistent):
+            app = Applet(name)
+
+            async def task():
+                runs.append(name)
+            app.add_task(task, 20, "task")
+            return app
+
+        scheduler = Scheduler()
+        first, second = make("First", False), make("Second", True)
+        scheduler.load(first)
+        scheduler.load(second, persistent=True)
+        with self.assertRaises(ValueError):
+            scheduler.load(first)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        self.assertIn("First", runs)
+        self.assertIn("Second", runs, "Applets not run concurrently.")
+
+        scheduler.focus("First")
+        self.assertTrue(second.suspended, "Background applet not suspended.")
+        runs.clear()
+        await asyncio.sleep(0.05)
+        self.assertNotIn("Second", runs, "Suspended applet still executed tasks.")
+        self.assertIn("First", runs)
+
+        scheduler.stop()
+        await runner
+        self.assertEqual(scheduler.applets, [], "Applets not unloaded.")
+
+    async def test_unload_shared_events(self):
+        events = Events()
+        app = Applet("Menu", events)
+
+        async def select(event):
+            pass
+
+        app.add_task(select, on_event="enter", task_id="select")
+        scheduler = Scheduler()
+        scheduler.load(app)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.01)
+        menu = weakref.ref(app)
+        del app
+        await scheduler.unload("Menu")
+        # The wakeup of the cancelled run is still queued and holds its frames until the loop runs once more.
+        await asyncio.sleep(0)
+        gc.collect()
+        self.assertEqual(events.handlers["enter"], [], "Triggered task still subscribed after unload.")
+        self.assertIsNone(menu(), "Unloaded Applet kept alive by the shared EventHandler.")
+        scheduler.stop()
+        await runner
+
+    async def test_switch(self):
+        # Debug mode records a traceback for every callback, which makes the switches several times slower.
+        asyncio.get_running_loop().set_debug(False)
+        resources = [0, 0]
+
+        def release(name):
+            resources[1] += 1
+
+        def make(name):
+            app = Applet(name)
+
+            async def draw():
+                resources[0] += 1
+                app.add_resource(name, release)
+                await asyncio.sleep(0)
+
+            app.add_task(draw, 0, "draw")
+            app.add_task(draw, 5, "frame")
+            return app
+
+        scheduler = Scheduler()
+        runner = asyncio.create_task(scheduler.run())
+        current = None
+        for switch in range(1000):
+            if switch == 100:
+                tracemalloc.start()
+            elif switch == 200:
+                gc.collect()
+                tasks = len(asyncio.all_tasks())
+                heap = tracemalloc.get_traced_memory()[0]
+            name = "Even" if switch % 2 else "Odd"
+            scheduler.load(make(name))
+            scheduler.focus(name)
+            if current is not None:
+                await scheduler.unload(current)
+            current = name
+            await asyncio.sleep(0)
+        await scheduler.unload(current)
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - heap
+        tracemalloc.stop()
+        self.assertLessEqual(len(asyncio.all_tasks()), tasks, "Live tasks grew with applet switches.")
+        self.assertLess(growth, 1024, "Heap grew with applet switches.")
+        self.assertEqual(resources[1], resources[0], "Resources not released on every switch.")
+        scheduler.stop()
+        await runner
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+""" Tests registry.py """
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+import weakref
+from registry import Registry
+from scheduler import Scheduler
+
+APPLET = '''
+from applet import Applet
+
+app = Applet("{name}")
+runs = []
+
+
+@app.task(interval=10)
+async def frame():
+    runs.append(1)
+'''
+
+
+class TestRegistry(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for name in ("app_clock", "app_menu", "_helper"):
+            with open(os.path.join(self.directory.name, f"{name}.py"), "w") as module:
+                module.write(APPLET.format(name=name))
+        self.scheduler = Scheduler()
+        self.registry = Registry(self.scheduler)
+
+    def tearDown(self):
+        for name in ("app_clock", "app_menu"):
+            sys.modules.pop(name, None)
+        if self.directory.name in sys.path:
+            sys.path.remove(self.directory.name)
+        self.directory.cleanup()
+
+    async def test_discover(self):
+        found = self.registry.discover(self.directory.name, "app_")
+        self.assertEqual(found, ["app_clock", "app_menu"])
+        self.assertNotIn("app_clock", sys.modules, "Applet imported during discovery.")
+
+    async def test_switch(self):
+        self.registry.discover(self.directory.name)
+        runner = asyncio.create_task(self.scheduler.run())
+        clock = weakref.ref(await self.registry.activate("app_clock"))
+        await asyncio.sleep(0.02)
+        runs = sys.modules["app_clock"].runs
+        self.assertTrue(runs, "Activated Applet not running.")
+        self.assertNotIn("app_menu", sys.modules, "Inactive Applet imported.")
+        await self.registry.activate("app_menu")
+        self.assertNotIn("app_clock", sys.modules, "Previous Applet module not released.")
+        self.assertIsNone(clock(), "Previous Applet not collected.")
+        self.assertEqual(self.scheduler.applets, ["app_menu"])
+        self.assertEqual(self.registry.active, "app_menu")
+        count = len(runs)
+        await asyncio.sleep(0.02)
+        self.assertEqual(len(runs), count, "Previous Applet still running.")
+        self.scheduler.stop()
+        await runner
+        with self.assertRaises(KeyError):
+            await self.registry.activate("unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
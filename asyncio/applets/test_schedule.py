@@ -0,0 +1,136 @@
+""" Tests schedule.py """
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import unittest
+import applet
+from applet import Applet
+from schedule import Schedule, freeze, precompile
+from virtual import run
+
+APPLET = '''
+from applet import Applet
+
+app = Applet("Frozen")
+runs = []
+
+
+@app.task(interval=100, args=("fast",))
+async def frame(name):
+    runs.append(name)
+
+
+@app.task(interval=250, task_id="slow", kwargs={"name": "slow"})
+async def slow(name):
+    runs.append(name)
+
+
+async def boot():
+    runs.append("boot")
+
+
+app.add_task(boot)
+'''
+
+
+class TestSchedule(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.directory.name, "app_frozen.py"), "w") as module:
+            module.write(APPLET)
+        sys.path.insert(0, self.directory.name)
+
+    def tearDown(self):
+        sys.path.remove(self.directory.name)
+        for module in ("app_frozen", "app_frozen_schedule"):
+            sys.modules.pop(module, None)
+        self.directory.cleanup()
+
+    def test_run(self):
+        runs = []
+
+        async def tick(name, delay=0):
+            runs.append((name, applet.ticks_ms()))
+
+        async def main():
+            schedule = Schedule(("a", "b", "once"), (tick, tick, tick), (100, 250, 0),
+                                (("a",), ("b",), ("once",)), (None, None, {"delay": 1}))
+            task = asyncio.create_task(schedule.run())
+            await asyncio.sleep(0.55)
+            task.cancel()
+
+        run(main(), 1000)
+        self.assertEqual([time for name, time in runs if name == "a"], [1000, 1100, 1200, 1300, 1400, 1500])
+        self.assertEqual([time for name, time in runs if name == "b"], [1000, 1250, 1500])
+        self.assertEqual([time for name, time in runs if name == "once"], [1000], "Task without interval repeated.")
+
+    def test_length(self):
+        async def tick():
+            pass
+
+        with self.assertRaises(ValueError):
+            Schedule(("a",), (tick, tick), (100, 100))
+
+    def test_freeze(self):
+        import app_frozen
+        schedule = freeze(app_frozen.app)
+        self.assertEqual(len(schedule), 3)
+        self.assertIn("slow", schedule.task_ids)
+        self.assertEqual(list(schedule.intervals), [100, 250, 0])
+
+    def test_precompile(self):
+        import app_frozen
+        stream = io.StringIO()
+        precompile(app_frozen.app, "app_frozen", stream)
+        with open(os.path.join(self.directory.name, "app_frozen_schedule.py"), "w") as module:
+            module.write(stream.getvalue())
+        sys.modules.pop("app_frozen")
+        import app_frozen_schedule
+        schedule = app_frozen_schedule.schedule
+        self.assertFalse(Applet.frozen, "Registration not restored after importing the schedule.")
+        self.assertEqual(list(sys.modules["app_frozen"].app.get_all_tasks()), [], "Schedule import registered tasks.")
+        self.assertEqual(schedule.task_ids, tuple(task.task_id for task in app_frozen.app.get_all_tasks()))
+        self.assertEqual(list(schedule.intervals), [task.interval for task in app_frozen.app.get_all_tasks()])
+
+        async def main():
+            task = asyncio.create_task(schedule.run())
+            await asyncio.sleep(0.3)
+            task.cancel()
+
+        run(main())
+        self.assertEqual(sys.modules["app_frozen"].runs.count("fast"), 3)
+        self.assertEqual(sys.modules["app_frozen"].runs.count("slow"), 2)
+        self.assertEqual(sys.modules["app_frozen"].runs.count("boot"), 1)
+
+    def test_precompile_closure(self):
+        app = Applet("Closure")
+
+        @app.task(interval=100)
+        async def frame():
+            pass
+
+        with self.assertRaises(ValueError):
+            precompile(app, __name__, io.StringIO())
+
+    def test_precompile_object(self):
+        import app_frozen
+        app = Applet("Object")
+        app.add_task(app_frozen.frame, 100, "frame", object())
+        with self.assertRaises(ValueError):
+            precompile(app, "app_frozen", io.StringIO())
+
+    def test_freeze_timeout(self):
+        app = Applet("Timeout")
+
+        @app.task(interval=100, timeout=50)
+        async def boot():
+            pass
+
+        with self.assertRaises(ValueError):
+            freeze(app)
+
+
+if __name__ == "__main__":
+    unittest.main()
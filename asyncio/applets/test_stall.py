@@ -0,0 +1,73 @@
+""" Tests stall.py """
+import asyncio
+import time
+import unittest
+import stall
+from applet import Applet
+from scheduler import Scheduler
+from virtual import run
+
+
+class TestStallDetector(unittest.IsolatedAsyncioTestCase):
+    async def test_stall(self):
+        scheduler = Scheduler(stall_threshold=50)
+        app = Applet("Test")
+
+        async def hang():
+            time.sleep(0.2)
+
+        async def tick():
+            pass
+
+        app.add_task(hang, 0, "hang")
+        app.add_task(tick, 10, "tick")
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.05)
+        self.assertEqual(scheduler.detector.stalls, 0, "Stall reported before it happened.")
+        scheduler.load(app)
+        await asyncio.sleep(0.1)
+        scheduler.stop()
+        await runner
+        self.assertEqual(scheduler.detector.stalls, 1, "Stall not reported once.")
+        self.assertEqual(scheduler.detector.last[1], ["hang"], "Offending task not reported.")
+        self.assertGreaterEqual(scheduler.detector.longest, 150)
+
+    async def test_stall_without_threads(self):
+        # As on CircuitPython, the stall is only noticed by the heartbeat once the task has finished.
+        threading, stall.threading = stall.threading, None
+        try:
+            await self.test_stall()
+        finally:
+            stall.threading = threading
+
+
+class TestStallDetectorVirtual(unittest.TestCase):
+    def test_stall_virtual(self):
+        async def main():
+            scheduler = Scheduler(stall_threshold=50)
+            app = Applet("Test")
+
+            async def hang():
+                # Computes for 200 ms of virtual time without awaiting.
+                asyncio.get_running_loop().clock.advance(200)
+
+            app.add_task(hang, 0, "hang")
+            scheduler.load(app)
+            runner = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(1)
+            scheduler.stop()
+            await runner
+            return scheduler.detector
+
+        threading, stall.threading = stall.threading, None
+        try:
+            # Far from the system ticks, which the detector must not mix with virtual ones.
+            detector = run(main(), (1 << 29) - 100)
+        finally:
+            stall.threading = threading
+        self.assertEqual(detector.stalls, 1, "Stall in virtual time not reported once.")
+        self.assertEqual(detector.last[1], ["hang"], "Offending task not reported.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+""" Tests virtual.py """
+import asyncio
+import time
+import unittest
+import applet
+from applet import Applet
+from virtual import run
+
+TICKS_PERIOD = 1 << 29
+
+
+class TestVirtualTime(unittest.TestCase):
+    def simulate(self, persistent):
+        runs = []
+
+        async def main():
+            app = Applet("Test")
+
+            async def tick():
+                runs.append(applet.ticks_ms())
+
+            app.add_task(tick, 1000, "tick")
+            runner = asyncio.create_task(app.run(persistent))
+            await asyncio.sleep(3600.5)
+            runner.cancel()
+            return app.get_task("tick").stats
+
+        # Start half an hour before the ticks wrap around.
+        start = time.monotonic()
+        stats = run(main(), TICKS_PERIOD - 1800 * 1000)
+        self.assertLess(time.monotonic() - start, 10, "An hour of scheduling not simulated in seconds.")
+        self.assertEqual(len(runs), 3601)
+        self.assertLess(runs[-1], runs[0], "Ticks did not wrap around.")
+        self.assertEqual(stats.max_late, 0, "Deadlines missed across the wraparound.")
+        self.assertEqual(stats.missed, 0)
+
+    def test_wraparound(self):
+        self.simulate(False)
+
+    def test_wraparound_persistent(self):
+        self.simulate(True)
+
+    def test_clock_restored(self):
+        run(asyncio.sleep(10))
+        self.assertIs(applet.ticks_ms, applet._system_clock, "System clock not restored.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Virtual time for running Applets under CPython"""
+import asyncio
+import math
+import selectors
+
+import applet
+
+_TICKS_PERIOD = 1 << 29
+
+
+class VirtualClock(object):
+    """Simulated clock. Time only advances while the event loop is idle, by jumping to the next timer.
+
+    :param int start: Initial `ticks_ms`, e.g. shortly before the wraparound at 2**29.
+    """
+
+    def __init__(self, start: int = 0):
+        self.now = start * 1000000
+
+    def ticks_ms(self) -> int:
+        return (self.now // 1000000) & (_TICKS_PERIOD - 1)
+
+    def advance(self, ms: float) -> None:
+        """Moves the clock forward, e.g. to simulate a task computing for a while."""
+        self.now += int(ms * 1000000)
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Selector that advances the clock by the timeout instead of waiting, unless there is I/O, e.g. from a
+    thread of a blocking task."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout: float = None) -> list:
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # Nothing is scheduled, only I/O can wake the event loop.
+            return super().select(None)
+        # Round up so the timer is due once the loop reads the clock again.
+        self.clock.now += math.ceil(timeout * 1000000) * 1000
+        return events
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Event loop running on a VirtualClock, so hours of scheduling are simulated in seconds.
+
+    :param clock: The simulated clock, created if not given.
+    :type clock: VirtualClock
+    """
+
+    def __init__(self, clock: VirtualClock = None):
+        self.clock = clock if clock is not None else VirtualClock()
+        super().__init__(VirtualSelector(self.clock))
+
+    def time(self) -> float:
+        return self.clock.now / 1000000000
+
+
+def run(main, start: int = 0):
+    """Runs a coroutine like `asyncio.run`, in virtual time. The Applet scheduler uses the virtual clock meanwhile.
+
+    :param main: Coroutine to run. Applets should be created inside it, once the clock is in place.
+    :param int start: Initial `ticks_ms` of the virtual clock.
+    :return: The result of the coroutine.
+    """
+    loop = VirtualEventLoop(VirtualClock(start))
+    applet.set_clock(loop.clock)
+    try:
+        return loop.run_until_complete(main)
+    finally:
+        applet.set_clock(None)
+        try:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            loop.close()
@@ -11,28 +11,39 @@ except (ImportError, NameError):
     from decorators.applets.lib.circuitpython_functools import partial
     from _types import GeneratorType
 
-import random
+import time
 
+from adafruit_ticks import ticks_add, ticks_diff, ticks_ms
 
-def gen_id(chars: int = 12) -> str:
-    """Generate a random ID of a specified length.
+try:
+    from heapq import heappop, heappush
+except ImportError:
+    from _heapq import heappop, heappush
 
-    :param chars: Number of characters to use for the ID.
-    :return:
-    """
-    ascii_lowercase = 'abcdefghijklmnopqrstuvwxyz'
-    ascii_uppercase = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-    digits = '0123456789'
-    id_choice = ascii_lowercase + ascii_uppercase + digits
-    return ''.join(random.choice(id_choice) for _ in range(chars))
+try:
+    from time import monotonic_ns
+except ImportError:
+    def monotonic_ns() -> int:
+        """Boards without long integers only have millisecond ticks."""
+        return ticks_ms() * 1000000
 
 
 class Applet(object):
     """Defines how an applet is to be run by the Scheduler."""
-    _tasks = {}
 
     def __init__(self, name):
         self._name = name
+        # Tasks by handle. Handles are handed out in order and never reused, names are optional
+        # and kept in side tables.
+        self._tasks = {}
+        self._names = {}
+        self._labels = {}
+        self._next_handle = 0
+        self._intervals = {}
+        self._jobs = {}
+        self._queue = []
+        self._running = False
+        self._elapsed = 0
 
     @property
     def name(self):
@@ -42,53 +53,85 @@ class Applet(object):
         """
         return self._name
 
-    def task(self, task_id: str = None, **func_args):
+    def task(self, task_id: str = None, interval: int = 0, **func_args):
         """Registers the function as a task to be executed later.
 
-        :param str task_id: Identification string for the task. Must be unique or any new tasks
-        will be overwritten.
+        :param str task_id: Optional name for the task, unique within the Applet.
+        :param int interval: Time in milliseconds between the starts of two runs. Tasks without
+        an interval run once.
         :param func_args: Dict of arguments to pass to the function.
         :return callable: The decorator object that registers the task.
         """
 
         def decorator(func):
-            """Registers the function as a task."""
-            args = func_args.pop("args", tuple())
-            kwargs = func_args.pop("kwargs", dict())
-            self.add_task(func, task_id, *args, **kwargs)
-
-            # Wrapper allows for multiple task decorators on a single function.
-            def wrapper(*w_args, **w_kwargs):
-                """ Do nothing; return as-is. """
-                return func(*w_args, **w_kwargs)
-
-            return wrapper
+            """Registers the function as a task and returns it unchanged, so task decorators can be stacked."""
+            self.add_task(func, task_id, *func_args.get("args", ()), interval=interval,
+                          **func_args.get("kwargs", {}))
+            return func
         return decorator
 
-    def add_task(self, func: callable, task_id: str = None, *args, **kwargs):
+    def add_task(self, func: callable, task_id: str = None, *args, interval: int = 0, **kwargs) -> int:
         """Add a function with arguments as a task to be executed at a later time.
 
+        A generator function runs cooperatively: each `yield` gives up the CPU to the other
+        tasks, and `yield ms` sleeps for at least that many milliseconds.
+
         :param func: Function object to execute as a task.
         :type func: callable
-        :param str task_id: Identification string for the task. Must be unique or any new tasks
-        with matching IDs will be overwritten.
+        :param str task_id: Optional name for the task, unique within the Applet.
         :param tuple args: List or Tuple of arguments to pass to the function.
+        :param int interval: Time in milliseconds between the starts of two runs. Tasks without
+        an interval run once.
         :param dict kwargs: Dict of keyword arguments to pass to the function.
+        :return: Handle of the task.
+        :rtype: int
         """
-        # Generate task IDs if not provided
-        if not task_id:
-            task_id = gen_id()
+        if task_id is not None and task_id in self._names:
+            raise ValueError(f"{self._name} already has a task named {task_id}")
+        handle = self._next_handle
+        self._next_handle += 1
+        self._tasks[handle] = partial(func, *args, **kwargs)
+        self._intervals[handle] = interval
+        if task_id is not None:
+            self._names[task_id] = handle
+            self._labels[handle] = task_id
+        if self._running:
+            self._jobs[handle] = self._Job(handle, interval, ticks_ms())
+            heappush(self._queue, self._jobs[handle])
+        return handle
+
+    def _handle(self, task) -> int:
+        """Handle of a task given by handle or by name."""
+        if isinstance(task, int):
+            return task
+        return self._names[task]
+
+    def _label(self, handle: int) -> str:
+        """Name of a task, or its handle for unnamed tasks."""
+        return self._labels.get(handle) or f"#{handle}"
 
-        self._tasks.update({
-            task_id: partial(func, *args, **kwargs)
-        })
+    def get_task(self, task) -> callable:
+        """Get a task by handle or by name.
+
+        :param task: Handle or name of the task.
+        :return: The function with its arguments.
+        :rtype: callable
+        """
+        return self._tasks[self._handle(task)]
 
-    def remove_task(self, task_id: str) -> None:
-        """Remove a task associated with the given ID.
+    def remove_task(self, task) -> None:
+        """Remove a task. Its name can be used again.
 
-        :param str task_id: Identification string for the task.
+        :param task: Handle or name of the task.
         """
-        del self._tasks[task_id]
+        handle = self._handle(task)
+        del self._tasks[handle]
+        del self._intervals[handle]
+        name = self._labels.pop(handle, None)
+        if name is not None:
+            del self._names[name]
+        if self._running:
+            self._jobs.pop(handle, None)
 
     @property
     def all_tasks(self) -> GeneratorType:
@@ -97,12 +140,117 @@ class Applet(object):
         :return: Iterable of tasks executed by the Applet.
         :rtype: GeneratorType
         """
-        for task_id, task in self._tasks.items():
-            yield task, task_id
+        for handle, task in self._tasks.items():
+            yield task, self._label(handle)
+
+    def stats(self) -> list:
+        """CPU time used by each task during the last run.
+
+        :return: Rows of (task_id, runs, cpu_ms, share), where share is the percentage of the
+        run's wall time spent in the task, busiest first.
+        :rtype: list
+        """
+        rows = []
+        for handle, job in self._jobs.items():
+            share = 100 * job.cpu / self._elapsed if self._elapsed else 0
+            rows.append((self._label(handle), job.runs, job.cpu / 1000000, share))
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows
+
+    def stop(self) -> None:
+        """Ends `run` once the current task gives up the CPU."""
+        self._running = False
 
     def run(self):
-        """ Executes the applet """
+        """Executes the applet's tasks round-robin until none is left to run or the applet is
+        stopped. Between runs, and while every task sleeps, the board sleeps until the next
+        deadline."""
         print(f"Starting {self._name}")
-        for task, task_id in self.all_tasks:
-            print(f"Executing: {task_id}")
-            task()
+        now = ticks_ms()
+        self._jobs = {handle: self._Job(handle, self._intervals[handle], now) for handle in self._tasks}
+        self._queue = list(self._jobs.values())
+        self._queue.sort()
+        self._running = True
+        self._elapsed = 0
+        started = monotonic_ns()
+        try:
+            while self._running and self._queue:
+                job = self._queue[0]
+                delay = ticks_diff(job.next_run, ticks_ms())
+                if delay > 0:
+                    time.sleep(delay / 1000)
+                    continue
+                heappop(self._queue)
+                if self._jobs.get(job.handle) is not job:
+                    # Removed while running.
+                    if job.gen is not None:
+                        job.gen.close()
+                    continue
+                if job.step(self._tasks[job.handle]):
+                    heappush(self._queue, job)
+        finally:
+            self._running = False
+            self._elapsed = monotonic_ns() - started
+            self._queue = []
+            for job in self._jobs.values():
+                if job.gen is not None:
+                    job.gen.close()
+                    job.gen = None
+
+    class _Job(object):
+        """Run state of a task, ordered by its next run so the earliest is at the top of the
+        heap. Tasks due at the same time take turns in the order they became due."""
+        __slots__ = ("handle", "interval", "next_run", "started", "gen", "runs", "cpu", "turn")
+        _turns = 0
+
+        def __init__(self, handle: int, interval: int, now: int):
+            self.handle = handle
+            self.interval = interval
+            self.next_run = now
+            self.started = now
+            self.gen = None
+            self.runs = 0
+            self.cpu = 0
+            self.turn = self._next_turn()
+
+        def __lt__(self, other) -> bool:
+            diff = ticks_diff(self.next_run, other.next_run)
+            return diff < 0 or (diff == 0 and self.turn < other.turn)
+
+        def step(self, func: callable) -> bool:
+            """Runs the task until it yields or returns.
+
+            :return: Whether the task has to be queued again.
+            """
+            start = monotonic_ns()
+            now = ticks_ms()
+            if self.gen is None:
+                self.started = now
+                self.runs += 1
+                result = func()
+                # Generators are recognised by their methods, `GeneratorType` from _types.py is the
+                # type of generator functions on CircuitPython.
+                if hasattr(result, "send"):
+                    self.gen = result
+            sleep = None
+            if self.gen is not None:
+                try:
+                    sleep = next(self.gen)
+                except StopIteration:
+                    self.gen = None
+            self.cpu += monotonic_ns() - start
+            if self.gen is not None:
+                self.next_run = ticks_add(now, sleep or 0)
+            elif self.interval:
+                self.next_run = ticks_add(self.started, self.interval)
+                if ticks_diff(self.next_run, now) < 0:
+                    self.next_run = now
+            else:
+                return False
+            self.turn = self._next_turn()
+            return True
+
+        @classmethod
+        def _next_turn(cls) -> int:
+            cls._turns += 1
+            return cls._turns
@@ -36,5 +36,29 @@ def guitar_solo() -> None:
 app.add_task(guitar_solo, task_id="signoff")
 
 
+# Generator tasks share the CPU: each yield lets the other tasks run, yielding a number sleeps.
+@app.task(task_id="countdown")
+def countdown():
+    """ Long job, split into steps """
+    for i in range(10, 0, -1):
+        print(i)
+        yield 1000
+    print("Liftoff!")
+    app.stop()
+
+
+@app.task(task_id="telemetry", interval=2000)
+def telemetry():
+    """ Runs every two seconds """
+    total = 0
+    for reading in range(1000):
+        total += reading
+        if reading % 100 == 0:
+            yield
+    print("Telemetry", total)
+
+
 if __name__ == "__main__":
     app.run()
+    for task_id, runs, cpu, share in app.stats():
+        print(f"{task_id}: {runs} runs, {cpu:.1f} ms, {share:.2f}% CPU")
@@ -0,0 +1,104 @@
+""" Tests the executor of applet.py """
+import os
+import unittest
+from importlib.util import module_from_spec, spec_from_file_location
+from adafruit_ticks import ticks_diff, ticks_ms
+
+# asyncio/applets also has an `applet` module, which is already imported when the tests run from the repository root.
+_spec = spec_from_file_location("decorators_applet", os.path.join(os.path.dirname(__file__), "applet.py"))
+applet = module_from_spec(_spec)
+_spec.loader.exec_module(applet)
+Applet = applet.Applet
+
+
+class TestApplet(unittest.TestCase):
+    def setUp(self):
+        self.app = Applet("Test")
+        self.runs = []
+
+    def stop_after(self, ms):
+        def stop():
+            yield ms
+            self.app.stop()
+        self.app.add_task(stop, "stop")
+
+    def test_once(self):
+        self.app.add_task(self.runs.append, None, "plain")
+        self.app.run()
+        self.assertEqual(self.runs, ["plain"], "Task without interval not executed once.")
+
+    def test_round_robin(self):
+        def count(name):
+            for _ in range(3):
+                self.runs.append(name)
+                yield
+
+        self.app.add_task(count, "a", "a")
+        self.app.add_task(count, "b", "b")
+        self.app.run()
+        self.assertEqual(self.runs, ["a", "b"] * 3, "Generator tasks did not take turns.")
+
+    def test_sleep(self):
+        def sleeper():
+            self.runs.append(ticks_ms())
+            yield 50
+            self.runs.append(ticks_ms())
+
+        self.app.add_task(sleeper, "sleeper")
+        self.app.run()
+        self.assertGreaterEqual(ticks_diff(self.runs[1], self.runs[0]), 50, "Yielded sleep not respected.")
+
+    def test_interval(self):
+        def tick():
+            self.runs.append(ticks_ms())
+            yield 5
+
+        self.app.add_task(tick, "tick", interval=30)
+        self.stop_after(100)
+        self.app.run()
+        self.assertEqual(len(self.runs), 4, "Task not restarted on its interval.")
+        # Runs start 30 ms apart, the task reads the ticks up to a millisecond after its start.
+        for previous, current in zip(self.runs, self.runs[1:]):
+            self.assertGreaterEqual(ticks_diff(current, previous), 29)
+
+    def test_stop(self):
+        closed = []
+
+        def forever():
+            try:
+                while True:
+                    yield 10
+            finally:
+                closed.append(True)
+
+        self.app.add_task(forever, "forever")
+        self.stop_after(30)
+        self.app.run()
+        self.assertEqual(closed, [True], "Running generator not closed on stop.")
+        self.assertEqual(self.app.stats()[0][1], 1)
+
+    def test_remove_while_running(self):
+        def count(name):
+            for _ in range(5):
+                self.runs.append(name)
+                yield
+
+        def remove():
+            yield
+            self.app.remove_task("a")
+
+        self.app.add_task(count, "a", "a")
+        self.app.add_task(count, "b", "b")
+        self.app.add_task(remove, "remove")
+        self.app.run()
+        self.assertEqual(self.runs.count("a"), 2, "Removed task still executed.")
+        self.assertEqual(self.runs.count("b"), 5)
+
+    def test_duplicate(self):
+        self.app.add_task(self.runs.append, "same")
+        with self.assertRaises(ValueError):
+            self.app.add_task(self.runs.append, "same")
+
+
+if __name__ == "__main__":
+    unittest.main()
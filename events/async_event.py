@@ -0,0 +1,150 @@
+""" Asynchronous EventHandler with a bounded queue """
+import asyncio
+
+from event import Event, EventHandler
+
+
+class AsyncEventHandler(EventHandler):
+    """EventHandler that queues events and executes the handlers from a dedicated task.
+
+    Events are stored in a fixed-capacity ring buffer, so posting an event never allocates and never blocks the
+    caller. When the buffer is full the policy decides which event is lost. Handlers may be functions or coroutine
+    functions. An exception raised by a handler ends the handling of that event only; it is counted in `errors` and
+    kept as `last_error`, and the drain task carries on with the next event.
+
+    :param capacity: Maximum number of events waiting to be handled.
+    :type capacity: int
+    :param budget: Maximum number of events handled before yielding to other tasks.
+    :type budget: int
+    :param policy: What to do with new events once the queue is full, or with duplicates of queued events.
+    :type policy: int
+    """
+    DROP_OLDEST = 0
+    DROP_NEWEST = 1
+    COALESCE = 2
+
+    def __init__(self, capacity: int = 16, budget: int = 4, policy: int = DROP_OLDEST):
+        super().__init__()
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if policy not in (self.DROP_OLDEST, self.DROP_NEWEST, self.COALESCE):
+            raise ValueError(f"Unknown policy: {policy}")
+        self.capacity = capacity
+        self.budget = budget
+        self.policy = policy
+        self._queue = [None] * capacity
+        self._head = 0
+        self._count = 0
+        self._pending = {}
+        self._ready = asyncio.Event()
+        self._task = None
+        # Counters
+        self.handled = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.errors = 0
+        self.last_error = None
+
+    @property
+    def depth(self) -> int:
+        """Number of events waiting to be handled."""
+        return self._count
+
+    def handle_event(self, event: Event) -> bool:
+        """Queues an event to be handled by the drain task. Events without handlers are discarded immediately.
+
+        :param event: The Event to handle
+        :type event: Event
+        :return: Whether the event was queued or merged with a queued event.
+        :rtype: bool
+        """
+        if not self._lookup(event):
+            return False
+        if self.policy == self.COALESCE and event in self._pending:
+            # Replace the queued duplicate so handlers see the latest timestamp.
+            self._queue[self._pending[event]] = event
+            self.coalesced += 1
+            return True
+        if self._count == self.capacity:
+            self.dropped += 1
+            if self.policy != self.DROP_OLDEST:
+                return False
+            self._pop()
+        index = (self._head + self._count) % self.capacity
+        self._queue[index] = event
+        self._count += 1
+        if self.policy == self.COALESCE:
+            self._pending[event] = index
+        if self._count > self.max_depth:
+            self.max_depth = self._count
+        self._ready.set()
+        return True
+
+    def handle_events(self, events) -> int:
+        """Queues a batch of Events in order, applying the capacity and policy to each as `handle_event` does.
+
+        :param events: Iterable of Events to handle.
+        :type events: Iterable[Event]
+        :return: Number of Events queued or merged with a queued event.
+        :rtype: int
+        """
+        queued = 0
+        for event in events:
+            if self.handle_event(event):
+                queued += 1
+        return queued
+
+    def _pop(self) -> Event:
+        event = self._queue[self._head]
+        self._queue[self._head] = None
+        if self.policy == self.COALESCE:
+            del self._pending[event]
+        self._head = (self._head + 1) % self.capacity
+        self._count -= 1
+        return event
+
+    async def dispatch(self, event: Event) -> None:
+        """Executes the handlers for an Event immediately, awaiting coroutine handlers in order. A handler returning
+        `STOP` consumes the Event.
+
+        :param event: The Event to handle
+        :type event: Event
+        """
+        for handler in self._lookup(event) or ():
+            result = handler(event)
+            if hasattr(result, "send"):
+                result = await result
+            if result is self.STOP:
+                break
+        self.handled += 1
+
+    async def run(self) -> None:
+        """Drains the queue forever, handling at most `budget` events per tick."""
+        while True:
+            if not self._count:
+                self._ready.clear()
+                await self._ready.wait()
+            for _ in range(min(self.budget, self._count)):
+                try:
+                    await self.dispatch(self._pop())
+                except Exception as error:
+                    self.errors += 1
+                    self.last_error = error
+            await asyncio.sleep(0)
+
+    def start(self) -> asyncio.Task:
+        """Creates the drain task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Cancels the drain task. Queued events are kept."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
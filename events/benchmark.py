@@ -0,0 +1,159 @@
+""" Benchmarks for event.py """
+import gc
+
+try:
+    from time import monotonic_ns
+except ImportError:
+    from supervisor import ticks_ms
+
+    def monotonic_ns():
+        """Millisecond resolution fallback for boards without `time.monotonic_ns`."""
+        return ticks_ms() * 1000000
+
+# tracemalloc only exists on CPython. On the device `gc.mem_free` is used instead.
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from event import EventHandler, EventPool, KeyPressEvent
+
+
+def _handler(event, *args, **kwargs):
+    pass
+
+
+def allocated(func, *args) -> int:
+    """Peak number of bytes allocated while running the function.
+
+    CPython frees temporaries immediately, so the peak is used rather than the net difference.
+    """
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, size = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return size
+    gc.disable()
+    try:
+        free = gc.mem_free()  # pylint: disable=no-member
+        func(*args)
+        return free - gc.mem_free()  # pylint: disable=no-member
+    finally:
+        gc.enable()
+
+
+def timed(func, *args) -> int:
+    """Nanoseconds taken to run the function."""
+    start = monotonic_ns()
+    func(*args)
+    return monotonic_ns() - start
+
+
+def bench_dispatch(iterations: int = 10000, instrumented: bool = False) -> None:
+    """Dispatches/sec and bytes allocated per dispatch of a single keypress."""
+    handler = EventHandler()
+    if instrumented:
+        handler.instrument()
+    event = KeyPressEvent("m", modifiers=["shift", "ctrl"])
+    handler.add_handler(KeyPressEvent("m", modifiers=["ctrl", "shift"]), _handler)
+    handler.add_handler(KeyPressEvent("m", modifiers=["ctrl", "shift"]), _handler, "arg")
+
+    def run(n):
+        for _ in range(n):
+            handler.handle_event(event)
+
+    run(100)
+    start = monotonic_ns()
+    run(iterations)
+    elapsed = monotonic_ns() - start
+    size = allocated(run, 1)
+    label = "instrumented" if instrumented else "dispatch"
+    print(f"{label}: {iterations * 1e9 / elapsed:.0f} dispatches/s, {size} B/dispatch")
+
+
+def bench_batch(events: int = 6400) -> None:
+    """Per-event `handle_event` against `handle_events` for batches of key presses."""
+    handler = EventHandler()
+    keys = [KeyPressEvent(name) for name in "abcdefgh"]
+    for key in keys:
+        handler.add_handler(key, _handler)
+    for size in (1, 8, 64):
+        batch = [keys[i % len(keys)] for i in range(size)]
+
+        def per_event(n):
+            for _ in range(n):
+                for event in batch:
+                    handler.handle_event(event)
+
+        def batched(n):
+            for _ in range(n):
+                handler.handle_events(batch)
+
+        rounds = events // size
+        single_ns = timed(per_event, rounds) / events
+        batch_ns = timed(batched, rounds) / events
+        print(f"batch: size {size:>2}, {single_ns:.0f} ns/event per event, {batch_ns:.0f} ns/event batched")
+
+
+def bench_wildcards(iterations: int = 10000) -> None:
+    """Cost of resolving wildcard subscriptions as the number of subscriptions grows."""
+    event = KeyPressEvent("m", modifiers=["ctrl"])
+    for subscriptions in (10, 100, 1000):
+        handler = EventHandler()
+        for i in range(subscriptions - 2):
+            handler.add_handler(f"sensor.{i}.*", _handler)
+        handler.add_handler("key.press.*.*", _handler)
+        handler.add_handler("key.**", _handler)
+
+        def resolve(n):
+            for _ in range(n):
+                handler._match(event)  # pylint: disable=protected-access
+
+        def dispatch(n):
+            for _ in range(n):
+                handler.handle_event(event)
+
+        resolve_ns = timed(resolve, iterations) / iterations
+        dispatch_ns = timed(dispatch, iterations) / iterations
+        print(
+            f"wildcards: {subscriptions:>4} subscriptions, {resolve_ns:.0f} ns/resolve, {dispatch_ns:.0f} ns/dispatch"
+        )
+
+
+def bench_memory(count: int = 10000) -> None:
+    """Memory used by synthetic key events, kept alive and streamed through an EventHandler with and without a pool."""
+    modifiers = ((), ("ctrl",), ("shift", "ctrl"), ("alt",))
+    names = "abcdefghijklmnopqrstuvwxyz"
+    handler = EventHandler()
+    handler.add_handler("key.**", _handler)
+    pool = EventPool(KeyPressEvent)
+
+    def live(n):
+        return [KeyPressEvent(names[i % 26], modifiers[i % 4], i + 1) for i in range(n)]
+
+    def stream(n):
+        for i in range(n):
+            handler.handle_event(KeyPressEvent(names[i % 26], modifiers[i % 4], i + 1))
+
+    def pooled(n):
+        for i in range(n):
+            event = pool.acquire(names[i % 26], modifiers[i % 4], i + 1)
+            handler.handle_event(event)
+            pool.release(event)
+
+    print(f"memory: {allocated(live, count) / count:.1f} B/live event")
+    for func in (stream, pooled):
+        elapsed = timed(func, count)
+        print(f"memory: {func.__name__:>6}, {allocated(func, count)} B peak, {count * 1e9 / elapsed:.0f} events/s")
+
+
+if __name__ == "__main__":
+    bench_dispatch()
+    bench_dispatch(instrumented=True)
+    bench_batch()
+    bench_wildcards()
+    bench_memory()
@@ -0,0 +1,121 @@
+""" Publish/subscribe channels between Applet tasks """
+import asyncio
+
+from event import Event, EventHandler
+
+# EventHandler shared by the channels returned by `channel()`.
+bus = EventHandler()
+_channels = {}
+
+
+class Message(Event):
+    """Event carrying a published message. Routed as `channel.<name>`."""
+    __slots__ = ("payload",)
+
+    def __init__(self, name: str, payload, timestamp: int = None):
+        self.payload = payload
+        super().__init__(name=name, timestamp=timestamp)
+
+
+class Subscription:
+    """Receives the messages published on a Channel after subscribing.
+
+    Messages are not copied, every subscriber receives the same object. Up to `capacity` messages are buffered, older
+    messages are dropped when a subscriber falls behind.
+
+    :param channel: The Channel subscribed to.
+    :type channel: Channel
+    :param capacity: Maximum number of buffered messages.
+    :type capacity: int
+    """
+
+    def __init__(self, channel: "Channel", capacity: int = 4):
+        self.channel = channel
+        self.capacity = capacity
+        self.dropped = 0
+        self._messages = []
+        self._ready = asyncio.Event()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get()
+
+    def deliver(self, event: Message) -> None:
+        """Handler registered with the Channel's EventHandler."""
+        if len(self._messages) >= self.capacity:
+            self._messages.pop(0)
+            self.dropped += 1
+        self._messages.append(event.payload)
+        self._ready.set()
+
+    async def get(self):
+        """Waits for the next message without polling."""
+        while not self._messages:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._messages.pop(0)
+
+    def get_nowait(self):
+        """Returns the next message, or None if none is buffered."""
+        return self._messages.pop(0) if self._messages else None
+
+    def close(self) -> None:
+        """Stops receiving messages."""
+        self.channel.event_handler.remove_handler(self.channel.event, self.deliver)
+
+
+class Channel:
+    """Typed publish/subscribe channel backed by an EventHandler.
+
+    :param name: Name of the channel. Messages are handled as `channel.<name>` Events.
+    :type name: str
+    :param message_type: Type every published message must be an instance of.
+    :type message_type: type
+    :param event_handler: EventHandler delivering the messages, defaults to the shared `bus`.
+    :type event_handler: EventHandler
+    """
+
+    def __init__(self, name: str, message_type: type = object, event_handler: EventHandler = None):
+        self.name = f"channel.{name}"
+        self.message_type = message_type
+        self.event_handler = event_handler if event_handler is not None else bus
+        self.event = Event(self.name)
+        self.published = 0
+
+    def publish(self, message) -> None:
+        """Delivers the message to every subscriber.
+
+        :param message: Instance of the channel's `message_type`.
+        """
+        if not isinstance(message, self.message_type):
+            raise TypeError(f"{self.name} only accepts {self.message_type.__name__} messages")
+        self.published += 1
+        self.event_handler.handle_event(Message(self.name, message))
+
+    def subscribe(self, capacity: int = 4) -> Subscription:
+        """Creates a Subscription receiving the messages published from now on.
+
+        :param capacity: Maximum number of buffered messages.
+        :type capacity: int
+        """
+        subscription = Subscription(self, capacity)
+        self.event_handler.add_handler(self.event, subscription.deliver)
+        return subscription
+
+
+def channel(name: str, message_type: type = object) -> Channel:
+    """Returns the Channel with the given name, creating it on first use. Applets use this to share channels by name.
+
+    :param name: Name of the channel.
+    :type name: str
+    :param message_type: Type every published message must be an instance of.
+    :type message_type: type
+    """
+    existing = _channels.get(name)
+    if existing is None:
+        existing = _channels[name] = Channel(name, message_type)
+    elif existing.message_type is not message_type:
+        raise TypeError(f"Channel {name} carries {existing.message_type.__name__} messages")
+    return existing
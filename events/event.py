@@ -1,8 +1,29 @@
 """  """
+try:
+    from time import monotonic_ns
+except ImportError:
+    monotonic_ns = None
+
 try:
     from supervisor import ticks_ms as ts
 except ImportError:
-    from time import time as ts
+    def ts():
+        """Millisecond timestamps, matching `supervisor.ticks_ms` on CPython."""
+        return monotonic_ns() // 1000000
+
+if monotonic_ns is None:
+    def monotonic_ns():
+        """Millisecond resolution fallback for boards without `time.monotonic_ns`."""
+        return ts() * 1000000
+
+_TICKS_PERIOD = 1 << 29
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+
+def ticks_diff(ticks1: int, ticks2: int) -> int:
+    """Signed difference between two timestamps, safe across `supervisor.ticks_ms` wraparound."""
+    return ((ticks1 - ticks2 + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
 
 
 try:
@@ -19,18 +40,28 @@ class Event:
     :param timestamp:
     :type timestamp: int
     """
+    # No per-instance `__dict__` on CPython. `count` is the number of raw Events represented after coalescing.
+    __slots__ = ("name", "timestamp", "count", "_key", "_hash")
+    # How a Coalescer merges bursts of this Event. None dispatches every Event as it arrives.
+    merge_policy = None
+    # Window in milliseconds for DEBOUNCE, events per second for THROTTLE.
+    merge_param = 0
 
     def __init__(self, name: str, timestamp: int = None):
         self.name = name
         self.timestamp = timestamp or ts()
+        self.count = 1
+        # Events are looked up on every dispatch, the key and hash are computed once.
+        self._key = self._make_key()
+        self._hash = hash(self._key)
 
     def __eq__(self, other):
         if isinstance(other, Event):
-            return self.__key() == other.__key()
+            return self._key == other._key
         return False
 
     def __hash__(self):
-        return hash(self.__key())
+        return self._hash
 
     def __repr__(self):
         return f"Event({self.name})>"
@@ -38,7 +69,12 @@ class Event:
     def __str__(self):
         return self.name
 
-    def __key(self):
+    @property
+    def path(self) -> tuple:
+        """Segments of the hierarchical name used for wildcard routing, e.g. `sensor.temp` -> `("sensor", "temp")`."""
+        return tuple(self.name.split("."))
+
+    def _make_key(self):
         return self.name
 
 
@@ -47,26 +83,160 @@ class KeyPressEvent(Event):
 
     :param name:
     :type name: str
-    :param modifiers:
-    :type modifiers:
+    :param modifiers: Modifier keys, stored as a sorted and interned tuple.
+    :type modifiers: Union[list[str], tuple[str]]
     :param timestamp:
     :type timestamp: int
     """
+    __slots__ = ("modifiers",)
 
-    def __init__(self, name: str, modifiers: list[str] = None, timestamp: int = None):
+    def __init__(self, name: str, modifiers: Union[list[str], tuple[str]] = None, timestamp: int = None):
+        self.modifiers = intern_modifiers(modifiers)
         super().__init__(name=name, timestamp=timestamp)
-        self.modifiers = sorted(modifiers) if modifiers else list()
 
     def __repr__(self):
         return f"KeypressEvent({self.name}, modifiers={self.modifiers}>"
 
     def __str__(self):
-        return "+".join(self.__key())
+        return "+".join(self._key)
+
+    @property
+    def path(self) -> tuple:
+        """Routed as `key.press.<modifiers>.<name>`, e.g. `key.press.ctrl.shift.m`."""
+        return "key", "press", *self.modifiers, self.name
 
-    def __key(self):
+    def _make_key(self):
         return *self.modifiers, self.name
 
 
+_MODIFIERS = {}
+# Upper bound of interned modifier combinations, further combinations are still sorted but not shared.
+_MODIFIERS_SIZE = 64
+
+
+def intern_modifiers(modifiers: Union[list[str], tuple[str]] = None) -> tuple:
+    """Returns the sorted modifiers as a tuple shared by every Event with the same modifiers.
+
+    Passing a tuple skips the conversion, so a hot path like `KeyPressEvent("m", ("ctrl",))` allocates nothing.
+    """
+    if not modifiers:
+        return ()
+    key = modifiers if isinstance(modifiers, tuple) else tuple(modifiers)
+    interned = _MODIFIERS.get(key)
+    if interned is None:
+        interned = tuple(sorted(key))
+        interned = _MODIFIERS.get(interned, interned)
+        if len(_MODIFIERS) < _MODIFIERS_SIZE:
+            _MODIFIERS[key] = interned
+            _MODIFIERS[interned] = interned
+    return interned
+
+
+class EventPool:
+    """Recycles Event instances of a hot Event type to reduce allocations and garbage collections.
+
+    Events must only be released after every handler is done with them, and pooled Events must not be used to
+    register handlers.
+
+    :param event_type: Event class to create instances of.
+    :type event_type: type
+    :param size: Maximum number of released Events kept for reuse.
+    :type size: int
+    """
+
+    def __init__(self, event_type: type = KeyPressEvent, size: int = 8):
+        self.event_type = event_type
+        self.size = size
+        self._free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args, **kwargs) -> Event:
+        """Returns a recycled Event, or a new one when the pool is empty. Accepts the Event type's arguments."""
+        if self._free:
+            event = self._free.pop()
+            event.__init__(*args, **kwargs)
+            self.reused += 1
+            return event
+        self.created += 1
+        return self.event_type(*args, **kwargs)
+
+    def release(self, event: Event) -> None:
+        """Returns an Event to the pool."""
+        if len(self._free) < self.size:
+            self._free.append(event)
+
+
+def _remove(handlers: dict, func: callable = None) -> int:
+    """Removes all handlers, or the handlers of a function, and returns how many were removed."""
+    removed = [order for order, h in handlers.items() if not func or h.func == func]
+    for order in removed:
+        del handlers[order]
+    return len(removed)
+
+
+class _TopicNode:
+    """Node of the prefix trie holding wildcard subscriptions."""
+
+    def __init__(self):
+        self.children = {}
+        self.star = None
+        # Handlers are keyed by the order they were added, so one-shot handlers are removed in O(1).
+        self.handlers = {}
+        self.globstar = {}
+
+    def insert(self, segments: list, handler) -> dict:
+        """Adds the handler to the node matching the pattern and returns the dict holding it."""
+        node = self
+        for i, segment in enumerate(segments):
+            if segment == "**":
+                if i != len(segments) - 1:
+                    raise ValueError("'**' is only allowed as the last segment of a pattern")
+                node.globstar[handler.order] = handler
+                return node.globstar
+            if segment == "*":
+                if node.star is None:
+                    node.star = _TopicNode()
+                node = node.star
+            else:
+                node = node.children.setdefault(segment, _TopicNode())
+        node.handlers[handler.order] = handler
+        return node.handlers
+
+    def remove(self, segments: list, func: callable = None) -> int:
+        """Removes the handlers subscribed with the pattern and returns how many were removed."""
+        node = self
+        for segment in segments:
+            if segment == "**":
+                return _remove(node.globstar, func)
+            node = node.star if segment == "*" else node.children.get(segment)
+            if node is None:
+                return 0
+        return _remove(node.handlers, func)
+
+    def clear(self) -> None:
+        """Removes every subscription. The dicts are emptied in place, one-shot handlers still hold them."""
+        for child in self.children.values():
+            child.clear()
+        if self.star is not None:
+            self.star.clear()
+        self.handlers.clear()
+        self.globstar.clear()
+
+    def match(self, path: tuple, index: int, out: list) -> None:
+        """Collects handlers matching the path. Cost depends on the path depth, not the number of subscriptions."""
+        if self.globstar:
+            out.extend(self.globstar.values())
+        if index == len(path):
+            out.extend(self.handlers.values())
+            return
+        child = self.children.get(path[index])
+        if child is not None:
+            child.match(path, index + 1, out)
+        if self.star is not None:
+            self.star.match(path, index + 1, out)
+
+
 class EventHandler:
     class Handler(object):
         """Contains extra attributes that otherwise wouldn't
@@ -93,10 +263,22 @@ class EventHandler:
             self.func = func
             self.args = args
             self.kwargs = kwargs
-
-        def __call__(self, event: Event = None, *args, **kwargs) -> None:
+            # Bare functions are called directly, skipping the bound method and argument packing.
+            self.fast = self.dispatch if args or kwargs else func
+            # Set by the EventHandler when the handler is added.
+            self.event = None
+            self.order = 0
+            self.priority = 0
+            self.once = False
+            self.owner = None
+
+        def __call__(self, event: Event = None, *args, **kwargs):
             n_kwargs = {**self.kwargs, **kwargs}
-            self.func(event, *self.args, *args, **n_kwargs)
+            return self.func(event, *self.args, *args, **n_kwargs)
+
+        def dispatch(self, event: Event):
+            """Calls the function without any per-call arguments, avoiding the merge of keyword arguments."""
+            return self.func(event, *self.args, **self.kwargs)
 
         def __eq__(self, other):
             if isinstance(other, self.__class__):
@@ -107,48 +289,129 @@ class EventHandler:
             return hash(self.__key())
 
         def __repr__(self) -> str:
-            return f"{self.__class__.__name__}{self.__dict__}"
+            return f"{self.__class__.__name__}({self.func}, args={self.args}, kwargs={self.kwargs})"
 
         def __key(self):
             return self.func, self.args, self.kwargs
 
+    # Maximum number of compiled handler tuples kept while wildcard subscriptions exist.
+    CACHE_SIZE = 128
+    # Return value of a handler that consumes the Event, skipping the remaining handlers.
+    STOP = True
+
     def __init__(self):
+        # Keyed by `Event._key` rather than the Event, which skips `__hash__`/`__eq__` on lookups and keeps the tables
+        # valid when pooled Events are reinitialized.
         self._handlers = {}
+        self._dispatch = {}
+        self._topics = _TopicNode()
+        self._wildcards = 0
+        self._order = 0
+        self.stats = None
 
     def __getitem__(self, item):
-        return self._handlers[item]
+        return list(self._handlers[item._key].values())
+
+    def _match(self, event: Event) -> list:
+        """All Handlers for an Event, exact matches and wildcard subscriptions, by priority then in the order they
+        were added."""
+        handlers = list(self._handlers[event._key].values()) if event._key in self._handlers else []
+        if self._wildcards:
+            self._topics.match(event.path, 0, handlers)
+        if len(handlers) > 1:
+            handlers.sort(key=lambda h: (-h.priority, h.order))
+        return handlers
+
+    def _compile(self, handler: Handler) -> callable:
+        call = handler.fast
+        if handler.once:
+            def call(event):
+                # Already removed by a reentrant `handle_event`, or by `remove_handler`.
+                if not self._discard(handler):
+                    return None
+                return handler.fast(event)
+        if self.stats is not None:
+            call = self.stats.wrap(handler, call)
+        return call
+
+    def _lookup(self, event: Event) -> tuple:
+        """Returns the compiled handler tuple used by `handle_event`, compiling it on first use."""
+        handlers = self._dispatch.get(event._key)
+        if handlers is None:
+            if not self._wildcards and event._key not in self._handlers:
+                return None
+            # Exact Events are bounded by `_handlers`, only wildcard matches can grow the tables without limit.
+            if self._wildcards and len(self._dispatch) >= self.CACHE_SIZE:
+                self._dispatch = {}
+            handlers = self._dispatch[event._key] = tuple(self._compile(h) for h in self._match(event))
+        return handlers
+
+    def _discard(self, handler: Handler) -> bool:
+        """Removes a single handler in O(1), used for one-shot handlers. Returns whether it was still registered."""
+        if handler.owner.pop(handler.order, None) is None:
+            return False
+        if isinstance(handler.event, str):
+            self._wildcards -= 1
+            self._dispatch = {}
+        else:
+            self._dispatch.pop(handler.event._key, None)
+        return True
 
-    def add_handler(self, event: Event, func: callable, *args, **kwargs):
+    def add_handler(
+        self, event: Union[Event, str], func: callable, *args, priority: int = 0, once: bool = False, **kwargs
+    ):
         """Adds a handler or list of handlers for a given Event.
 
+        Events can also be subscribed to by their hierarchical name. `*` matches exactly one segment and `**` matches
+        any remaining segments, e.g. `key.press.*` or `key.**`.
+
+        Handlers with a higher priority are executed first. A handler returning `EventHandler.STOP` consumes the Event
+        and the remaining handlers are skipped.
+
         :param event: List of events in which to add handlers.
-        :type event: list[Event]
+        :type event: Union[Event, str]
         :param func: A function or list of functions to execute when an Event is received.
         :type func: callable,
+        :param priority: Handlers with a higher priority are executed first.
+        :type priority: int
+        :param once: Remove the handler after it has been executed once.
+        :type once: bool
         """
         if not callable(func):
             raise TypeError("func must be a callable object")
         handler = self.Handler(func, *args, **kwargs)
-        if event in self._handlers:
-            self._handlers[event].append(handler)
-        else:
-            self._handlers[event] = [handler]
-
-    def remove_handler(self, event: Event, handler: callable = None):
-        """Removes some or all of the registered handlers for a given Event.
+        handler.event = event
+        handler.order = self._order
+        handler.priority = priority
+        handler.once = once
+        self._order += 1
+        if isinstance(event, str):
+            handler.owner = self._topics.insert(event.split("."), handler)
+            self._wildcards += 1
+            self._dispatch = {}
+            return
+        handler.owner = self._handlers.setdefault(event._key, {})
+        handler.owner[handler.order] = handler
+        self._dispatch.pop(event._key, None)
+
+    def remove_handler(self, event: Union[Event, str], handler: callable = None):
+        """Removes some or all of the registered handlers for a given Event or hierarchical name.
 
         :param event: List of events in which to clear handlers.
-        :type event: list[Event]
+        :type event: Union[Event, str]
         :param handler: A function or list of functions to remove from the handlers.
         :type handler: Union[callable, list[callable]]
         """
-        if event in self._handlers.keys():
+        if isinstance(event, str):
+            self._wildcards -= self._topics.remove(event.split("."), handler)
+            self._dispatch = {}
+        elif event._key in self._handlers:
             if handler:
-                for h in self._handlers[event]:
-                    if h.func == handler:
-                        self._handlers[event].remove(h)
+                _remove(self._handlers[event._key], handler)
             else:
-                del self._handlers[event]
+                # Emptied in place, one-shot handlers still hold the dict.
+                self._handlers.pop(event._key).clear()
+            self._dispatch.pop(event._key, None)
 
     def clear_handlers(self, events: Union[Event, list[Event]] = None):
         """Clears all the registered handlers for all Events or a given list of Events.
@@ -157,23 +420,311 @@ class EventHandler:
         :type events: Union[Event, list[Event]]
         """
         if events:
-            if isinstance(events, Event):
+            if isinstance(events, (Event, str)):
                 events = [events]
             for e in events:
                 self.remove_handler(e)
         else:
+            for handlers in self._handlers.values():
+                handlers.clear()
             self._handlers = {}
+            self._dispatch = {}
+            self._topics.clear()
+            self._wildcards = 0
+
+    def instrument(self, budget: int = None, log: callable = print) -> "Instrumentation":
+        """Starts recording the execution time of every handler. Handlers are only timed while instrumented.
+
+        :param budget: Latency budget in milliseconds. Handlers exceeding it are logged.
+        :type budget: int
+        :param log: Function called with a message for every handler exceeding the budget.
+        :type log: callable
+        :return: The Instrumentation collecting the statistics.
+        :rtype: Instrumentation
+        """
+        self.stats = Instrumentation(budget, log)
+        self._dispatch = {}
+        return self.stats
+
+    def uninstrument(self) -> None:
+        """Stops recording handler execution times."""
+        self.stats = None
+        self._dispatch = {}
 
     def handle_event(self, event: Event, *args, **kwargs):
-        """Takes an event and executes any associated handlers. Also accepts options arguments to pass as well.
-        The Event object is accessible to handlers in `kwargs["_event"]`.
+        """Takes an event and executes any associated handlers. Also accepts optional arguments to pass as well.
+        The Event object is passed to handlers as the first argument.
+
+        :param event: The Event to handle
+        :type event: Event
+        """
+        handlers = self._lookup(event)
+        if not handlers:
+            return
+        stats = self.stats
+        if stats is not None:
+            start = monotonic_ns()
+        if args or kwargs:
+            for handler in self._match(event):
+                # Skips one-shot handlers already removed by an earlier handler of this dispatch.
+                if handler.once and not self._discard(handler):
+                    continue
+                if stats is None:
+                    result = handler(event, *args, **kwargs)
+                else:
+                    called = monotonic_ns()
+                    result = handler(event, *args, **kwargs)
+                    stats.record(handler, event, monotonic_ns() - called)
+                if result is self.STOP:
+                    break
+        else:
+            for handler in handlers:
+                if handler(event) is self.STOP:
+                    break
+        if stats is not None:
+            stats.record_event(event, monotonic_ns() - start)
+
+    def handle_events(self, events) -> int:
+        """Handles a batch of Events in order, e.g. all the Events of one input poll.
+
+        Handlers are resolved once per Event type in the batch rather than once per Event. Handlers added or removed
+        by a handler apply to the rest of the batch.
+
+        :param events: Iterable of Events to handle.
+        :type events: Iterable[Event]
+        :return: Number of Events that had handlers.
+        :rtype: int
+        """
+        handled = 0
+        stop = self.STOP
+        stats = self.stats
+        for event in events:
+            # Re-read every time, handlers may invalidate the table.
+            handlers = self._dispatch.get(event._key)
+            if handlers is None:
+                handlers = self._lookup(event)
+            if not handlers:
+                continue
+            handled += 1
+            if stats is not None:
+                start = monotonic_ns()
+            for handler in handlers:
+                if handler(event) is stop:
+                    break
+            if stats is not None:
+                stats.record_event(event, monotonic_ns() - start)
+        return handled
+
+
+class LatencyHistogram:
+    """Execution time statistics in a fixed-size histogram, so recording never allocates.
+
+    Bucket `i` counts durations below `2**i` microseconds, the last bucket counts everything above.
+    """
+    BUCKETS = 20
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * self.BUCKETS
+
+    def add(self, duration: int) -> None:
+        """Records a duration in nanoseconds."""
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        bucket = 0
+        limit = 1000
+        while duration >= limit and bucket < self.BUCKETS - 1:
+            bucket += 1
+            limit <<= 1
+        self.buckets[bucket] += 1
+
+    def percentile(self, percent: int) -> int:
+        """Upper bound in nanoseconds of the bucket holding the given percentile, capped at the maximum duration."""
+        target = self.count * percent / 100
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(1000 << bucket, self.max)
+        return self.max
+
+
+class Instrumentation:
+    """Execution time statistics per handler, and per Event for the time spent in all of its handlers.
+
+    Only the synchronous part of coroutine handlers is timed.
+
+    :param budget: Latency budget in milliseconds. Handlers exceeding it are logged.
+    :type budget: int
+    :param log: Function called with a message for every handler exceeding the budget.
+    :type log: callable
+    """
+
+    def __init__(self, budget: int = None, log: callable = print):
+        self.budget = budget * 1000000 if budget is not None else None
+        self.log = log
+        self.handlers = {}
+        self.events = {}
+
+    def wrap(self, handler: EventHandler.Handler, call: callable) -> callable:
+        """Wraps a compiled handler to record its execution time."""
+        def timed(event):
+            start = monotonic_ns()
+            result = call(event)
+            self.record(handler, event, monotonic_ns() - start)
+            return result
+        return timed
+
+    def record(self, handler: EventHandler.Handler, event: Event, duration: int) -> None:
+        """Records the execution time of a handler in nanoseconds."""
+        stats = self.handlers.get(handler.order)
+        if stats is None:
+            name = getattr(handler.func, "__name__", repr(handler.func))
+            stats = self.handlers[handler.order] = LatencyHistogram(name)
+        stats.add(duration)
+        if self.budget is not None and duration > self.budget:
+            self.log(f"Slow handler: {stats.name} took {duration / 1000000:.2f} ms handling {event}")
+
+    def record_event(self, event: Event, duration: int) -> None:
+        """Records the time spent in all the handlers of one Event in nanoseconds."""
+        stats = self.events.get(event._key)
+        if stats is None:
+            stats = self.events[event._key] = LatencyHistogram(str(event))
+        stats.add(duration)
+
+    def report(self) -> list:
+        """Statistics of every handler and Event, slowest first.
+
+        :return: Tuples of kind, name, count, total, max and p95 execution time in milliseconds.
+        :rtype: list[tuple]
+        """
+        rows = []
+        for kind, table in (("handler", self.handlers), ("event", self.events)):
+            for stats in table.values():
+                rows.append((
+                    kind, stats.name, stats.count, stats.total / 1000000, stats.max / 1000000,
+                    stats.percentile(95) / 1000000,
+                ))
+        rows.sort(key=lambda row: -row[4])
+        return rows
+
+    def dump(self) -> None:
+        """Prints the statistics of every handler and Event, slowest first."""
+        print("kind     name                 count   total ms   max ms   p95 ms")
+        for kind, name, count, total, maximum, p95 in self.report():
+            print(f"{kind:<8} {name:<20} {count:>5} {total:>10.3f} {maximum:>8.3f} {p95:>8.3f}")
+
+
+class Coalescer:
+    """Collapses bursts of Events into one handler invocation per frame.
+
+    Events are posted as they arrive and `flush` is called once per frame. Each Event type declares how bursts are
+    merged with `merge_policy` and `merge_param`, which can be overridden per Event with `set_policy`.
+
+    - LATEST: Only the most recent Event of the frame is handled.
+    - COUNT: Same as LATEST, `Event.count` holds the number of raw Events merged.
+    - DEBOUNCE: Handled once no new Event arrived for `merge_param` milliseconds.
+    - THROTTLE: Handled at most `merge_param` times per second.
+
+    :param event_handler: The EventHandler executing the merged Events.
+    :type event_handler: EventHandler
+    """
+    LATEST = 0
+    COUNT = 1
+    DEBOUNCE = 2
+    THROTTLE = 3
+
+    def __init__(self, event_handler: EventHandler):
+        self.event_handler = event_handler
+        self._policies = {}
+        self._pending = {}
+        self._last_dispatch = {}
+        self.received = 0
+        self.merged = 0
+        self.dispatched = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of merged Events waiting for a flush."""
+        return len(self._pending)
+
+    def set_policy(self, event: Event, policy: int = None, param: int = 0) -> None:
+        """Overrides the merge policy declared by the Event type.
+
+        :param event: Event to merge with the policy.
+        :type event: Event
+        :param policy: One of LATEST, COUNT, DEBOUNCE or THROTTLE. None dispatches without merging.
+        :type policy: int
+        :param param: Window in milliseconds for DEBOUNCE, events per second for THROTTLE.
+        :type param: int
+        """
+        if policy == self.THROTTLE and param <= 0:
+            raise ValueError("THROTTLE requires a rate above 0")
+        self._policies[event] = (policy, param)
+
+    def _policy(self, event: Event) -> tuple:
+        policy = self._policies.get(event)
+        if policy is None:
+            policy = event.merge_policy, event.merge_param
+            if policy[0] == self.THROTTLE and policy[1] <= 0:
+                raise ValueError(f"THROTTLE of {type(event).__name__} requires a merge_param rate above 0")
+        return policy
+
+    def post(self, event: Event, now: int = None) -> None:
+        """Merges an Event with the pending Events of the frame.
 
         :param event: The Event to handle
         :type event: Event
+        :param now: Timestamp in milliseconds, defaults to the current time.
+        :type now: int
+        """
+        self.received += 1
+        if self._policy(event)[0] is None:
+            self.dispatched += 1
+            self.event_handler.handle_event(event)
+            return
+        now = ts() if now is None else now
+        pending = self._pending.get(event)
+        if pending is None:
+            self._pending[event] = [event, 1, now]
+        else:
+            self.merged += 1
+            pending[0] = event
+            pending[1] += 1
+            pending[2] = now
+
+    def flush(self, now: int = None) -> int:
+        """Handles every pending Event whose policy allows it. Call once per frame.
+
+        :param now: Timestamp in milliseconds, defaults to the current time.
+        :type now: int
+        :return: Number of Events handled.
+        :rtype: int
         """
-        if event in self._handlers:
-            if kwargs is None:
-                kwargs = dict()
-            kwargs["_event"] = event
-            for handler in self._handlers[event]:
-                handler(event)
+        if not self._pending:
+            return 0
+        now = ts() if now is None else now
+        ready = []
+        for key, (event, count, last_seen) in self._pending.items():
+            policy, param = self._policy(key)
+            if policy == self.DEBOUNCE:
+                if ticks_diff(now, last_seen) < param:
+                    continue
+            elif policy == self.THROTTLE:
+                last = self._last_dispatch.get(key)
+                if last is not None and ticks_diff(now, last) < 1000 // param:
+                    continue
+                self._last_dispatch[key] = now
+            # Reused Event instances keep the count of their previous flush otherwise.
+            event.count = count if policy == self.COUNT else 1
+            ready.append(key)
+        for key in ready:
+            event = self._pending.pop(key)[0]
+            self.dispatched += 1
+            self.event_handler.handle_event(event)
+        return len(ready)
@@ -0,0 +1,198 @@
+""" Recording and replay of the Events handled by an EventHandler """
+import struct
+import time
+
+from event import Event, EventHandler, KeyPressEvent, intern_modifiers, ticks_diff, ts
+
+try:
+    from typing import BinaryIO
+except ImportError:
+    pass
+
+MAGIC = b"EVT1"
+# Every record is 8 bytes: kind, modifiers id, name id, timestamp.
+# Definition records reuse the timestamp field for the length of the UTF-8 payload following the record.
+RECORD = "<BBHI"
+RECORD_SIZE = struct.calcsize(RECORD)
+STRING = 0
+TYPE = 1
+MODIFIERS = 2
+# Event records use `EVENT + type id` as their kind.
+EVENT = 16
+# Highest ID of each definition kind that fits an Event record.
+LIMITS = {STRING: 0xFFFF, TYPE: 0xFF - EVENT, MODIFIERS: 0xFF}
+
+
+class EventRecorder:
+    """Writes Events to a compact binary log.
+
+    Names, Event types and modifier combinations are written once as definitions and referenced by ID afterwards, so
+    each Event takes a single fixed-width record. A log holds up to 65536 names, 240 Event types and 256 modifier
+    combinations. Once one runs out, the attached EventHandler stops being recorded, `error` tells why, and Events
+    keep being handled.
+
+    :param stream: Writable binary file-like object.
+    :type stream: BinaryIO
+    """
+
+    def __init__(self, stream: "BinaryIO"):
+        self.stream = stream
+        self.recorded = 0
+        self.error = None
+        self._buffer = bytearray(RECORD_SIZE)
+        self._strings = {}
+        self._types = {}
+        self._modifiers = {(): 0}
+        self._handler = None
+        self._batched = None
+        stream.write(MAGIC)
+
+    def _define(self, kind: int, table: dict, key, value: str) -> int:
+        index = len(table)
+        if index > LIMITS[kind]:
+            raise ValueError(f"Log is full, no ID left for {value!r}")
+        table[key] = index
+        payload = value.encode()
+        struct.pack_into(RECORD, self._buffer, 0, kind, 0, index, len(payload))
+        self.stream.write(self._buffer)
+        self.stream.write(payload)
+        return index
+
+    def record(self, event: Event) -> None:
+        """Appends an Event to the log.
+
+        :raises ValueError: If the log has no ID left for the name, type or modifiers of the Event.
+        """
+        name = self._strings.get(event.name)
+        if name is None:
+            name = self._define(STRING, self._strings, event.name, event.name)
+        event_type = self._types.get(type(event))
+        if event_type is None:
+            event_type = self._define(TYPE, self._types, type(event), type(event).__name__)
+        modifiers = getattr(event, "modifiers", ())
+        index = self._modifiers.get(modifiers)
+        if index is None:
+            index = self._define(MODIFIERS, self._modifiers, modifiers, "+".join(modifiers))
+        struct.pack_into(RECORD, self._buffer, 0, EVENT + event_type, index, name, event.timestamp & 0xFFFFFFFF)
+        self.stream.write(self._buffer)
+        self.recorded += 1
+
+    def attach(self, event_handler: EventHandler) -> None:
+        """Records every Event passed to `event_handler.handle_event` or `event_handler.handle_events` before it is
+        handled."""
+        self.detach()
+        handle_event = event_handler.handle_event
+        handle_events = event_handler.handle_events
+
+        def record_event(event, *args, **kwargs):
+            # Batches of handlers that queue each Event through `handle_event` were recorded already.
+            if event is not self._batched:
+                self._record(event)
+            return handle_event(event, *args, **kwargs)
+
+        def record_events(events):
+            try:
+                return handle_events(self._recorded(events))
+            finally:
+                self._batched = None
+
+        event_handler.handle_event = record_event
+        event_handler.handle_events = record_events
+        self._handler = event_handler
+
+    def _record(self, event: Event) -> None:
+        try:
+            self.record(event)
+        except ValueError as error:
+            self.error = error
+            self.detach()
+
+    def _recorded(self, events):
+        """Records the Events of a batch as the EventHandler takes them."""
+        for event in events:
+            if self._handler is not None:
+                self._record(event)
+            self._batched = event
+            yield event
+
+    def detach(self) -> None:
+        """Stops recording the attached EventHandler."""
+        if self._handler is not None:
+            del self._handler.handle_event
+            del self._handler.handle_events
+            self._handler = None
+
+
+class EventReplayer:
+    """Reads a log written by EventRecorder one record at a time, so logs larger than RAM can be replayed.
+
+    :param stream: Readable binary file-like object.
+    :type stream: BinaryIO
+    :param types: Event classes by name, used to recreate recorded Events of custom types.
+    :type types: dict
+    """
+
+    def __init__(self, stream: "BinaryIO", types: dict = None):
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not an event log")
+        self.stream = stream
+        self.types = {"Event": Event, "KeyPressEvent": KeyPressEvent}
+        if types:
+            self.types.update(types)
+        self.replayed = 0
+        self.elapsed = 0
+        self._buffer = bytearray(RECORD_SIZE)
+        self._strings = []
+        self._event_types = []
+        self._modifiers = [()]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Event:
+        while True:
+            if self.stream.readinto(self._buffer) != RECORD_SIZE:
+                raise StopIteration
+            kind, modifiers, name, value = struct.unpack_from(RECORD, self._buffer)
+            if kind >= EVENT:
+                event_type = self._event_types[kind - EVENT]
+                if event_type is KeyPressEvent:
+                    return event_type(self._strings[name], self._modifiers[modifiers], value)
+                return event_type(self._strings[name], value)
+            payload = self.stream.read(value).decode()
+            if kind == STRING:
+                self._strings.append(payload)
+            elif kind == TYPE:
+                self._event_types.append(self.types.get(payload, Event))
+            elif kind == MODIFIERS:
+                self._modifiers.append(intern_modifiers(tuple(payload.split("+"))))
+
+    @property
+    def throughput(self) -> float:
+        """Events replayed per second."""
+        return self.replayed * 1000 / self.elapsed if self.elapsed else 0.0
+
+    def replay(self, event_handler: EventHandler, speed: float = 1.0) -> int:
+        """Passes the recorded Events to `event_handler.handle_event`.
+
+        :param event_handler: EventHandler handling the replayed Events.
+        :type event_handler: EventHandler
+        :param speed: 1.0 replays at the recorded speed, 2.0 twice as fast. 0 replays as fast as possible.
+        :type speed: float
+        :return: Number of Events replayed.
+        :rtype: int
+        """
+        start = ts()
+        first = None
+        for event in self:
+            if speed > 0:
+                if first is None:
+                    first = event.timestamp
+                delay = ticks_diff(event.timestamp, first) / speed - ticks_diff(ts(), start)
+                if delay > 0:
+                    time.sleep(delay / 1000)
+            event_handler.handle_event(event)
+            self.replayed += 1
+        self.elapsed = ticks_diff(ts(), start)
+        print(f"Replayed {self.replayed} events in {self.elapsed} ms ({self.throughput:.0f} events/s)")
+        return self.replayed
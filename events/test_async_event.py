@@ -0,0 +1,102 @@
+""" Tests async_event.py """
+import asyncio
+import unittest
+from async_event import AsyncEventHandler
+from event import Event
+
+
+class TestAsyncEventHandler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.calls = []
+
+    async def record(self, event, *args, **kwargs):
+        await asyncio.sleep(0)
+        self.calls.append(event.timestamp)
+
+    def record_sync(self, event, *args, **kwargs):
+        self.calls.append(-event.timestamp)
+
+    def make_handler(self, **kwargs):
+        handler = AsyncEventHandler(capacity=2, **kwargs)
+        handler.add_handler(Event("a"), self.record)
+        handler.add_handler(Event("b"), self.record_sync)
+        return handler
+
+    async def drain(self, handler):
+        handler.start()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await handler.stop()
+
+    async def test_handlers(self):
+        handler = self.make_handler()
+        self.assertTrue(handler.handle_event(Event("a", 1)))
+        self.assertTrue(handler.handle_event(Event("b", 2)))
+        self.assertFalse(handler.handle_event(Event("c", 3)), "Event without handlers was queued.")
+        self.assertEqual(handler.depth, 2)
+        await self.drain(handler)
+        self.assertEqual(self.calls, [1, -2], "Handlers not executed in order.")
+        self.assertEqual((handler.depth, handler.handled), (0, 2))
+
+    async def test_drop_oldest(self):
+        handler = self.make_handler(policy=AsyncEventHandler.DROP_OLDEST)
+        for timestamp in (1, 2, 3):
+            handler.handle_event(Event("a", timestamp))
+        await self.drain(handler)
+        self.assertEqual(self.calls, [2, 3], "Oldest event not dropped.")
+        self.assertEqual(handler.dropped, 1)
+
+    async def test_drop_newest(self):
+        handler = self.make_handler(policy=AsyncEventHandler.DROP_NEWEST)
+        for timestamp in (1, 2, 3):
+            handler.handle_event(Event("a", timestamp))
+        await self.drain(handler)
+        self.assertEqual(self.calls, [1, 2], "Newest event not dropped.")
+        self.assertEqual(handler.dropped, 1)
+
+    async def test_coalesce(self):
+        handler = self.make_handler(policy=AsyncEventHandler.COALESCE)
+        for timestamp in (1, 2, 3):
+            handler.handle_event(Event("a", timestamp))
+        handler.handle_event(Event("b", 4))
+        await self.drain(handler)
+        self.assertEqual(self.calls, [3, -4], "Duplicate events not coalesced.")
+        self.assertEqual((handler.coalesced, handler.dropped), (2, 0))
+
+    async def test_budget(self):
+        handler = AsyncEventHandler(capacity=8, budget=2)
+        handler.add_handler(Event("b"), self.record_sync)
+        for timestamp in range(1, 6):
+            handler.handle_event(Event("b", timestamp))
+        handler.start()
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.calls), 2, "Budget not respected.")
+        await handler.stop()
+
+    async def test_handle_events(self):
+        handler = self.make_handler(policy=AsyncEventHandler.DROP_NEWEST)
+        events = [Event("a", 1), Event("c", 2), Event("b", 3), Event("a", 4)]
+        self.assertEqual(handler.handle_events(events), 2, "Batch not queued through handle_event.")
+        self.assertEqual((handler.depth, handler.dropped), (2, 1))
+        await self.drain(handler)
+        self.assertEqual(self.calls, [1, -3], "Coroutine handlers not awaited in order.")
+
+    async def test_error(self):
+        handler = self.make_handler()
+
+        def fail(event):
+            raise RuntimeError("failed")
+
+        handler.add_handler(Event("c"), fail)
+        handler.start()
+        handler.handle_event(Event("c", 1))
+        await asyncio.sleep(0)
+        handler.handle_event(Event("b", 2))
+        await self.drain(handler)
+        self.assertEqual(self.calls, [-2], "Event after a failing handler not handled.")
+        self.assertEqual(handler.errors, 1)
+        self.assertIsInstance(handler.last_error, RuntimeError)
+
+
+if __name__ == "__main__":
+    unittest.main()
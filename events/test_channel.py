@@ -0,0 +1,57 @@
+""" Tests channel.py """
+import asyncio
+import unittest
+from channel import Channel, channel
+from event import EventHandler
+
+
+class TestChannel(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.channel = Channel("sensor", dict, EventHandler())
+
+    async def test_publish(self):
+        first = self.channel.subscribe()
+        second = self.channel.subscribe()
+        message = {"temp": 21}
+        waiter = asyncio.create_task(first.get())
+        await asyncio.sleep(0)
+        self.channel.publish(message)
+        self.assertIs(await waiter, message, "Subscriber did not receive the published message.")
+        self.assertIs(await second.get(), message, "Message copied between subscribers.")
+
+    async def test_iterate(self):
+        subscription = self.channel.subscribe()
+        for i in range(3):
+            self.channel.publish({"temp": i})
+        received = []
+        async for message in subscription:
+            received.append(message["temp"])
+            if len(received) == 3:
+                break
+        self.assertEqual(received, [0, 1, 2])
+
+    async def test_capacity(self):
+        subscription = self.channel.subscribe(capacity=2)
+        for i in range(3):
+            self.channel.publish({"temp": i})
+        self.assertEqual(subscription.dropped, 1)
+        self.assertEqual(await subscription.get(), {"temp": 1}, "Oldest message not dropped.")
+
+    def test_close(self):
+        subscription = self.channel.subscribe()
+        subscription.close()
+        self.channel.publish({})
+        self.assertIsNone(subscription.get_nowait(), "Closed subscription received a message.")
+
+    def test_type(self):
+        with self.assertRaises(TypeError):
+            self.channel.publish("not a dict")
+
+    def test_shared(self):
+        self.assertIs(channel("shared", int), channel("shared", int), "Channels with the same name not shared.")
+        with self.assertRaises(TypeError):
+            channel("shared", str)
+
+
+if __name__ == "__main__":
+    unittest.main()
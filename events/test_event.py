@@ -1,6 +1,7 @@
 """ Tests event.py """
+import time
 import unittest
-from event import EventHandler, Event, KeyPressEvent
+from event import Coalescer, EventHandler, EventPool, Event, KeyPressEvent, LatencyHistogram, ticks_diff
 
 
 class TestEvent(unittest.TestCase):
@@ -52,14 +53,62 @@ class TestKeyPressEvent(unittest.TestCase):
             "KeyPressEvent with modifiers does not equal similar KeyPressEvent with modifiers.",
         )
 
+    def test_event_modifiers_not_equal(self):
+        self.assertNotEqual(
+            self.event_basic,
+            KeyPressEvent("k", modifiers=["ctrl"]),
+            "KeyPressEvent with modifiers equals KeyPressEvent without modifiers.",
+        )
+        self.assertNotEqual(
+            hash(self.event_modifiers),
+            hash(KeyPressEvent("m", modifiers=["alt"])),
+            "KeyPressEvent hash does not include modifiers.",
+        )
+
     def test_event_modifiers(self):
         event = KeyPressEvent("p", modifiers=["ctrl", "alt"])
         self.assertEqual(
             event.modifiers,
-            ["alt", "ctrl"],
+            ("alt", "ctrl"),
             "KeyPressEvent modifiers are not set or not sorted.",
         )
 
+    def test_event_modifiers_interned(self):
+        self.assertIs(
+            KeyPressEvent("a", modifiers=["shift", "ctrl"]).modifiers,
+            KeyPressEvent("b", modifiers=("ctrl", "shift")).modifiers,
+            "KeyPressEvent modifiers are not interned.",
+        )
+
+    def test_event_slots(self):
+        self.assertFalse(hasattr(self.event_basic, "__dict__"), "KeyPressEvent has a per-instance __dict__.")
+
+
+class TestEventPool(unittest.TestCase):
+    def test_pool(self):
+        pool = EventPool(KeyPressEvent, size=1)
+        event = pool.acquire("a", ("ctrl",), timestamp=1000)
+        pool.release(event)
+        pool.release(KeyPressEvent("b"))
+        recycled = pool.acquire("c", timestamp=2000)
+        self.assertIs(recycled, event, "Released Event not reused.")
+        self.assertEqual(
+            (str(recycled), recycled.timestamp, recycled.count), ("c", 2000, 1), "Recycled Event not reinitialized."
+        )
+        self.assertEqual(recycled, KeyPressEvent("c"))
+        self.assertEqual((pool.created, pool.reused), (1, 1))
+
+    def test_pooled_dispatch(self):
+        event_handler = EventHandler()
+        calls = []
+        event_handler.add_handler(KeyPressEvent("a"), lambda event: calls.append(str(event)))
+        pool = EventPool(KeyPressEvent)
+        for name in ("b", "a", "b", "a"):
+            event = pool.acquire(name)
+            event_handler.handle_event(event)
+            pool.release(event)
+        self.assertEqual(calls, ["a", "a"], "Reinitialized Events not dispatched correctly.")
+
 
 class TestEventHandler(unittest.TestCase):
     event_handler = EventHandler()
@@ -92,5 +141,325 @@ class TestEventHandler(unittest.TestCase):
         )
 
 
+class TestEventHandlerDispatch(unittest.TestCase):
+    def setUp(self):
+        self.event_handler = EventHandler()
+        self.event = KeyPressEvent("d", modifiers=["ctrl"])
+        self.calls = []
+
+    def record(self, event, *args, **kwargs):
+        self.calls.append((event, args, kwargs))
+
+    def other(self, event, *args, **kwargs):
+        self.calls.append(None)
+
+    def test_handler_arguments(self):
+        self.event_handler.add_handler(self.event, self.record, 1, key="value")
+        self.event_handler.handle_event(KeyPressEvent("d", modifiers=["ctrl"]))
+        self.event_handler.handle_event(self.event, 2, other="value")
+        self.assertEqual(
+            self.calls,
+            [
+                (self.event, (1,), {"key": "value"}),
+                (self.event, (1, 2), {"key": "value", "other": "value"}),
+            ],
+            "Handler arguments not passed in the expected order.",
+        )
+
+    def test_remove_handler_recompiles(self):
+        self.event_handler.add_handler(self.event, self.record)
+        self.event_handler.add_handler(self.event, self.other)
+        self.event_handler.add_handler(self.event, self.record)
+        self.event_handler.remove_handler(self.event, self.record)
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(self.calls, [None], "Removed handlers are still executed.")
+
+        self.event_handler.remove_handler(self.event)
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(self.calls, [None], "Removed event is still handled.")
+
+    def test_handle_events(self):
+        self.event_handler.add_handler(self.event, self.record)
+        self.event_handler.add_handler(Event("o"), self.other, once=True)
+        events = [self.event, Event("o"), KeyPressEvent("x"), Event("o"), self.event]
+        self.assertEqual(self.event_handler.handle_events(iter(events)), 3)
+        self.assertEqual(
+            self.calls, [(self.event, (), {}), None, (self.event, (), {})], "Batch not handled in order."
+        )
+
+    def test_keymap_cached(self):
+        keymap = [Event(str(code)) for code in range(EventHandler.CACHE_SIZE + 72)]
+        for event in keymap:
+            self.event_handler.add_handler(event, self.other)
+        compiled = [self.event_handler._lookup(event) for event in keymap]
+        for event, handlers in zip(keymap, compiled):
+            self.assertIs(self.event_handler._lookup(event), handlers, "Exact Events recompiled.")
+        self.assertEqual(len(self.event_handler._dispatch), len(keymap))
+
+    def test_clear_handlers(self):
+        self.event_handler.add_handler(self.event, self.record)
+        self.event_handler.clear_handlers()
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(self.calls, [], "Cleared handlers are still executed.")
+
+
+class TestEventHandlerPriority(unittest.TestCase):
+    def setUp(self):
+        self.event_handler = EventHandler()
+        self.event = KeyPressEvent("p")
+        self.calls = []
+
+    def add(self, name, result=None, **kwargs):
+        def handler(event, *args, **h_kwargs):
+            self.calls.append(name)
+            return result
+        self.event_handler.add_handler(self.event, handler, **kwargs)
+
+    def test_priority(self):
+        self.add("global")
+        self.add("focus", priority=10)
+        self.add("fallback", priority=-1)
+        self.add("global2")
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(self.calls, ["focus", "global", "global2", "fallback"], "Handlers not sorted by priority.")
+
+    def test_stop_propagation(self):
+        self.add("global")
+        self.add("focus", result=EventHandler.STOP, priority=10)
+        self.event_handler.handle_event(self.event)
+        self.event_handler.handle_event(self.event, "arg")
+        self.assertEqual(self.calls, ["focus", "focus"], "Consumed event still propagated.")
+
+    def test_once(self):
+        self.add("once", once=True)
+        self.add("always")
+        self.event_handler.handle_event(self.event)
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(self.calls, ["once", "always", "always"], "One-shot handler executed more than once.")
+        self.assertEqual(len(self.event_handler[self.event]), 1, "One-shot handler not removed.")
+
+    def test_once_wildcard(self):
+        self.event_handler.add_handler("key.**", lambda event, *args: self.calls.append("once"), once=True)
+        self.event_handler.handle_event(self.event, "arg")
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(self.calls, ["once"], "One-shot subscription executed more than once.")
+
+    def test_once_reentrant(self):
+        def nest(event, *args):
+            self.calls.append("nest")
+            if not args:
+                self.event_handler.handle_event(self.event, "nested")
+
+        self.event_handler.add_handler(self.event, nest, priority=1)
+        self.add("once", once=True)
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(self.calls, ["nest", "nest", "once"], "One-shot handler executed by both events.")
+
+    def test_once_removed(self):
+        def once(event, *args):
+            self.calls.append("once")
+
+        def remove(event, *args):
+            self.event_handler.remove_handler(self.event, once)
+
+        for args in ((), ("arg",)):
+            self.event_handler.add_handler(self.event, remove, priority=1)
+            self.event_handler.add_handler(self.event, once, once=True)
+            self.event_handler.handle_event(self.event, *args)
+            self.event_handler.remove_handler(self.event)
+        self.assertEqual(self.calls, [], "One-shot handler removed during the dispatch still executed.")
+
+    def test_once_cleared(self):
+        self.event_handler.add_handler("key.**", lambda event, *args: self.calls.append("once"), once=True)
+        # Handlers compiled for a dispatch in progress while the handlers are cleared.
+        compiled = self.event_handler._lookup(self.event)
+        self.event_handler.clear_handlers()
+        compiled[0](self.event)
+        self.assertEqual(self.calls, [], "Cleared one-shot handler executed.")
+        self.assertEqual(self.event_handler._wildcards, 0, "Wildcard count corrupted.")
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.event_handler = EventHandler()
+        self.messages = []
+        self.event = KeyPressEvent("i")
+
+    @staticmethod
+    def fast(event, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def slow(event, *args, **kwargs):
+        time.sleep(0.002)
+
+    def test_stats(self):
+        self.event_handler.add_handler(self.event, self.fast)
+        self.event_handler.add_handler(self.event, self.slow, once=True)
+        stats = self.event_handler.instrument(budget=1, log=self.messages.append)
+        self.event_handler.handle_event(self.event)
+        self.event_handler.handle_event(self.event, "arg")
+        rows = {(kind, name): row for kind, name, *row in stats.report()}
+        self.assertEqual(rows[("handler", "fast")][0], 2, "Handler calls not counted.")
+        self.assertEqual(rows[("event", "i")][0], 2, "Events not counted once.")
+        self.assertGreaterEqual(rows[("event", "i")][2], 2, "Event not timed across all of its handlers.")
+        count, total, maximum, p95 = rows[("handler", "slow")]
+        self.assertEqual(count, 1)
+        self.assertGreaterEqual(maximum, 2)
+        self.assertLessEqual(p95, maximum)
+        self.assertEqual(len(self.messages), 1, "Slow handler not logged.")
+        self.assertIn("slow", self.messages[0])
+
+    def test_stats_batch(self):
+        self.event_handler.add_handler(self.event, self.fast)
+        self.event_handler.add_handler(self.event, self.fast)
+        stats = self.event_handler.instrument()
+        self.event_handler.handle_events([self.event, self.event])
+        self.assertEqual(stats.events[self.event._key].count, 2, "Batched Events not counted once.")
+        self.assertEqual(stats.handlers[0].count, 2)
+
+    def test_uninstrument(self):
+        self.event_handler.add_handler(self.event, self.fast)
+        stats = self.event_handler.instrument()
+        self.event_handler.uninstrument()
+        self.event_handler.handle_event(self.event)
+        self.assertEqual(stats.report(), [], "Handlers timed after uninstrumenting.")
+
+    def test_histogram(self):
+        histogram = LatencyHistogram("test")
+        for duration in [500] * 94 + [5000000] * 6:
+            histogram.add(duration)
+        self.assertEqual((histogram.count, histogram.max), (100, 5000000))
+        self.assertEqual(histogram.percentile(50), 1000, "Percentile not the upper bound of its bucket.")
+        self.assertEqual(histogram.percentile(95), 5000000)
+
+
+class TestEventHandlerWildcards(unittest.TestCase):
+    def setUp(self):
+        self.event_handler = EventHandler()
+        self.calls = []
+
+    def subscribe(self, pattern):
+        self.event_handler.add_handler(pattern, lambda event: self.calls.append(pattern))
+
+    def test_path(self):
+        self.assertEqual(Event("sensor.temp").path, ("sensor", "temp"))
+        self.assertEqual(
+            KeyPressEvent("m", modifiers=["shift", "ctrl"]).path, ("key", "press", "ctrl", "shift", "m")
+        )
+
+    def test_wildcards(self):
+        for pattern in ("key.press.ctrl.m", "key.press.*", "key.press.*.m", "key.**", "sensor.*"):
+            self.subscribe(pattern)
+        self.event_handler.handle_event(KeyPressEvent("m", modifiers=["ctrl"]))
+        self.assertEqual(
+            self.calls, ["key.press.ctrl.m", "key.press.*.m", "key.**"], "Wildcard subscriptions not matched."
+        )
+        self.calls.clear()
+        self.event_handler.handle_event(KeyPressEvent("k"))
+        self.assertEqual(self.calls, ["key.press.*", "key.**"])
+
+    def test_order(self):
+        self.event_handler.add_handler(KeyPressEvent("m"), lambda event: self.calls.append("exact"))
+        self.subscribe("key.**")
+        self.event_handler.add_handler(KeyPressEvent("m"), lambda event: self.calls.append("last"))
+        self.event_handler.handle_event(KeyPressEvent("m"))
+        self.assertEqual(self.calls, ["exact", "key.**", "last"], "Handlers not executed in the order added.")
+
+    def test_remove(self):
+        self.subscribe("key.**")
+        self.event_handler.handle_event(KeyPressEvent("m"))
+        self.event_handler.remove_handler("key.**")
+        self.event_handler.handle_event(KeyPressEvent("m"))
+        self.assertEqual(self.calls, ["key.**"], "Removed subscription still executed.")
+
+    def test_cache_bounded(self):
+        self.subscribe("sensor.*")
+        for index in range(EventHandler.CACHE_SIZE + 1):
+            self.event_handler.handle_event(Event(f"sensor.{index}"))
+        self.assertLessEqual(len(self.event_handler._dispatch), EventHandler.CACHE_SIZE)
+
+    def test_globstar_position(self):
+        with self.assertRaises(ValueError):
+            self.subscribe("key.**.m")
+
+
+class EncoderEvent(Event):
+    merge_policy = Coalescer.COUNT
+
+
+class UnratedEvent(Event):
+    merge_policy = Coalescer.THROTTLE
+
+
+class TestCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.event_handler = EventHandler()
+        self.coalescer = Coalescer(self.event_handler)
+        self.calls = []
+        for event in (Event("a"), Event("b"), EncoderEvent("turn")):
+            self.event_handler.add_handler(event, self.record)
+
+    def record(self, event, *args, **kwargs):
+        self.calls.append((event.timestamp, event.count))
+
+    def test_no_policy(self):
+        self.coalescer.post(Event("a", 1), now=0)
+        self.assertEqual(self.calls, [(1, 1)], "Event without policy not dispatched immediately.")
+
+    def test_count(self):
+        for timestamp in range(1, 6):
+            self.coalescer.post(EncoderEvent("turn", timestamp), now=timestamp)
+        self.assertEqual(self.calls, [], "Event dispatched before flush.")
+        self.assertEqual(self.coalescer.flush(now=6), 1)
+        self.assertEqual(self.calls, [(5, 5)], "Events not merged into the latest with a count.")
+        self.assertEqual(
+            (self.coalescer.received, self.coalescer.merged, self.coalescer.dispatched), (5, 4, 1)
+        )
+
+    def test_count_reused(self):
+        event = EncoderEvent("turn")
+        for count in (3, 1):
+            for _ in range(count):
+                self.coalescer.post(event, now=0)
+            self.coalescer.flush(now=0)
+        self.assertEqual([count for _, count in self.calls], [3, 1], "Reused Event kept its previous count.")
+
+    def test_latest(self):
+        self.coalescer.set_policy(Event("a"), Coalescer.LATEST)
+        self.coalescer.post(Event("a", 1), now=1)
+        self.coalescer.post(Event("a", 2), now=2)
+        self.coalescer.flush(now=3)
+        self.coalescer.flush(now=4)
+        self.assertEqual(self.calls, [(2, 1)], "Latest event not dispatched once, without a count.")
+
+    def test_debounce(self):
+        self.coalescer.set_policy(Event("a"), Coalescer.DEBOUNCE, 50)
+        self.coalescer.post(Event("a", 1), now=0)
+        self.coalescer.post(Event("a", 2), now=40)
+        self.assertEqual(self.coalescer.flush(now=80), 0, "Event dispatched within debounce window.")
+        self.assertEqual(self.coalescer.flush(now=90), 1)
+        self.assertEqual(self.calls, [(2, 1)])
+
+    def test_throttle(self):
+        self.coalescer.set_policy(Event("b"), Coalescer.THROTTLE, 10)
+        for now in range(20, 300, 20):
+            self.coalescer.post(Event("b", now), now=now)
+            self.coalescer.flush(now=now)
+        self.assertEqual(
+            [timestamp for timestamp, _ in self.calls], [20, 120, 220], "Event not throttled to 10 per second."
+        )
+        with self.assertRaises(ValueError):
+            self.coalescer.set_policy(Event("b"), Coalescer.THROTTLE, 0)
+
+    def test_throttle_without_rate(self):
+        with self.assertRaises(ValueError):
+            self.coalescer.post(UnratedEvent("c"), now=0)
+        self.assertEqual(self.coalescer.flush(now=1), 0, "Event without rate left pending.")
+
+    def test_ticks_wraparound(self):
+        self.assertEqual(ticks_diff(5, (1 << 29) - 5), 10, "Timestamp difference not wraparound safe.")
+
+
 if __name__ == "__main__":
     unittest.main()
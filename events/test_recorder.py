@@ -0,0 +1,88 @@
+""" Tests recorder.py """
+import io
+import unittest
+from async_event import AsyncEventHandler
+from event import Event, EventHandler, KeyPressEvent
+from recorder import RECORD_SIZE, EventRecorder, EventReplayer
+
+
+class EncoderEvent(Event):
+    __slots__ = ()
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        self.events = [
+            KeyPressEvent("m", modifiers=["ctrl", "shift"], timestamp=1000),
+            KeyPressEvent("m", modifiers=["shift", "ctrl"], timestamp=1010),
+            KeyPressEvent("k", timestamp=1020),
+            EncoderEvent("turn", timestamp=1030),
+            Event("sensor.temp", timestamp=1040),
+        ]
+        self.stream = io.BytesIO()
+        self.event_handler = EventHandler()
+        self.recorder = EventRecorder(self.stream)
+        self.recorder.attach(self.event_handler)
+        for event in self.events:
+            self.event_handler.handle_event(event)
+        self.recorder.detach()
+        self.stream.seek(0)
+
+    def test_record(self):
+        self.assertEqual(self.recorder.recorded, 5)
+        self.event_handler.handle_event(Event("ignored"))
+        self.assertEqual(self.recorder.recorded, 5, "Events recorded after detaching.")
+
+    def test_record_batch(self):
+        for event_handler in (EventHandler(), AsyncEventHandler()):
+            recorder = EventRecorder(io.BytesIO())
+            recorder.attach(event_handler)
+            event_handler.handle_events(iter(self.events[:2]))
+            self.assertEqual(recorder.recorded, 2, f"Batch not recorded once by {type(event_handler).__name__}.")
+            recorder.detach()
+            event_handler.handle_events(self.events)
+            self.assertEqual(recorder.recorded, 2, "Batch recorded after detaching.")
+
+    def test_compact(self):
+        # Header, 5 events and one definition per name, type and modifier combination.
+        definitions = len("mksensor.tempturnKeyPressEventEncoderEventEventctrl+shift") + 8 * RECORD_SIZE
+        self.assertEqual(len(self.stream.getvalue()), 4 + 5 * RECORD_SIZE + definitions)
+
+    def test_replay(self):
+        replayed = []
+        event_handler = EventHandler()
+        event_handler.add_handler("**", lambda event: replayed.append(event))
+        replayer = EventReplayer(self.stream, types={"EncoderEvent": EncoderEvent})
+        self.assertEqual(replayer.replay(event_handler, speed=0), 5)
+        self.assertEqual(replayed, self.events, "Replayed events do not match the recording.")
+        self.assertEqual([e.timestamp for e in replayed], [e.timestamp for e in self.events])
+        self.assertEqual([type(e) for e in replayed], [type(e) for e in self.events])
+        self.assertIs(replayed[0].modifiers, self.events[0].modifiers, "Replayed modifiers not interned.")
+
+    def test_replay_speed(self):
+        replayer = EventReplayer(self.stream)
+        replayer.replay(EventHandler(), speed=2.0)
+        self.assertGreaterEqual(replayer.elapsed, 19, "Recorded timing not respected.")
+
+    def test_full(self):
+        handled = []
+        self.event_handler.add_handler("**", lambda event: handled.append(event))
+        self.stream.seek(0, 2)
+        self.recorder.attach(self.event_handler)
+        for index in range(300):
+            self.event_handler.handle_event(KeyPressEvent("m", modifiers=[str(index)]))
+        self.assertEqual(len(handled), 300, "Events not handled once the log is full.")
+        # No modifiers and ctrl+shift already use 2 of the 256 modifier IDs.
+        self.assertEqual(self.recorder.recorded, 5 + 254, "Events recorded past the modifier IDs.")
+        self.assertIsInstance(self.recorder.error, ValueError)
+        with self.assertRaises(ValueError):
+            self.recorder.record(KeyPressEvent("m", modifiers=["full"]))
+        self.assertEqual(len(list(EventReplayer(io.BytesIO(self.stream.getvalue())))), 5 + 254)
+
+    def test_invalid_log(self):
+        with self.assertRaises(ValueError):
+            EventReplayer(io.BytesIO(b"nope"))
+
+
+if __name__ == "__main__":
+    unittest.main()